@@ -0,0 +1,63 @@
+"""
+Measures bootstrap confidence intervals of an agreement with random counts. Exits with a non-zero status if the
+resamples take longer than --max-seconds (default: MAX_BOOTSTRAP_SECONDS), so it can guard against regressions of
+the large bootstraps F1Agreement.bootstrap_ci is meant for.
+
+    python -m benchmarks.bench_bootstrap --documents 100000 --resamples 10000
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from benchmarks.timing import best_of
+
+# 10k resamples over 100k documents took about 9 s when this was set
+MAX_BOOTSTRAP_SECONDS = 15
+
+
+def random_agreement(documents, annotators=3, labels=4, seed=0):
+    """
+    F1Agreement with random counts of up to 20 annotations per document and label.
+    """
+    from bratiaa.agree import F1Agreement
+    rng = np.random.RandomState(seed)
+    f1_agreement = F1Agreement(None, [f'LABEL-{i}' for i in range(labels)],
+                               annotators=[f'ann-{i}' for i in range(annotators)],
+                               documents=[f'doc-{i}.ann' for i in range(documents)], backend='dense', count=False)
+    num_pairs, _, _, num_labels = f1_agreement._pdcl.shape
+    pairs, docs, label_ids = (a.ravel() for a in np.indices((num_pairs, documents, num_labels)))
+    totals = rng.randint(0, 21, size=len(pairs)) * 2
+    tps = rng.binomial(totals // 2, 0.8)
+    f1_agreement._pdcl.add_cells(np.tile(pairs, 2), np.tile(docs, 2), np.repeat([0, 1], len(pairs)),
+                                 np.tile(label_ids, 2), np.concatenate((tps, totals)))
+    return f1_agreement
+
+
+def bootstrap_seconds(f1_agreement, resamples, repeat=1):
+    """
+    Best time of repeat bootstraps with given number of resamples.
+    """
+    return best_of(f1_agreement.bootstrap_ci, resamples, repeat=repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents', type=int, default=100000, help='Number of documents (default: %(default)s)')
+    parser.add_argument('--annotators', type=int, default=3, help='Number of annotators (default: %(default)s)')
+    parser.add_argument('--resamples', type=int, default=10000, help='Number of resamples (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of repetitions (best time is reported)')
+    parser.add_argument('--max-seconds', type=float, default=MAX_BOOTSTRAP_SECONDS,
+                        help='Fail if the bootstrap takes longer (default: %(default)s)')
+    args = parser.parse_args()
+
+    f1_agreement = random_agreement(args.documents, annotators=args.annotators)
+    seconds = bootstrap_seconds(f1_agreement, args.resamples, args.repeat)
+    print(f'{args.resamples} resamples over {args.documents} documents: {seconds:.3f} s')
+    if seconds > args.max_seconds:
+        print(f'Bootstrap takes longer than {args.max_seconds} s!')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
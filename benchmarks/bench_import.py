@@ -0,0 +1,67 @@
+"""
+Measures the time it takes to import bratiaa in a fresh interpreter and checks that heavy optional dependencies are
+only loaded on the code paths that need them. Exits with a non-zero status if the import takes longer than
+--max-seconds (default: MAX_IMPORT_SECONDS) or loads any of the heavy modules, so it can guard against startup time
+regressions.
+
+    python -m benchmarks.bench_import --max-seconds 0.5
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+# only needed for drawing heatmaps, printing tables or computing kappa
+HEAVY_MODULES = ['matplotlib', 'scipy', 'sklearn', 'tabulate', 'setuptools']
+
+# importing bratiaa took about 0.2 s on top of interpreter startup when this was set
+MAX_IMPORT_SECONDS = 0.5
+
+
+def import_seconds(module, repeat):
+    """
+    Best time of importing given module in a fresh interpreter minus the interpreter's startup time.
+    """
+    seconds = min(_run_seconds([sys.executable, '-c', f'import {module}']) for _ in range(repeat))
+    return seconds - min(_run_seconds([sys.executable, '-c', 'pass']) for _ in range(repeat))
+
+
+def _run_seconds(command):
+    start = time.perf_counter()
+    subprocess.run(command, check=True)
+    return time.perf_counter() - start
+
+
+def loaded_heavy_modules(module='bratiaa'):
+    """
+    Heavy modules loaded by importing given module in a fresh interpreter.
+    """
+    code = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE)
+    return [m for m in output.stdout.decode('utf-8').strip().split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repetitions (best time is reported)')
+    parser.add_argument('--max-seconds', type=float, default=MAX_IMPORT_SECONDS,
+                        help='Fail if importing bratiaa takes longer (on top of interpreter startup, default: '
+                             '%(default)s)')
+    args = parser.parse_args()
+
+    failed = False
+    for module in ['bratiaa', 'bratiaa.agree_cli']:
+        seconds = import_seconds(module, args.repeat)
+        print(f'{module:>18}: {seconds:.3f} s')
+        if seconds > args.max_seconds:
+            print(f'Importing {module} takes longer than {args.max_seconds} s!')
+            failed = True
+        heavy = loaded_heavy_modules(module)
+        if heavy:
+            print(f'Importing {module} loads heavy modules: {", ".join(heavy)}')
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Compares the read-only parser of bratiaa.parser with bratsubset.annotation.Annotations on a large synthetic ANN file.
+
+    python -m benchmarks.bench_parser --entities 50000
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+import bratsubset.annotation as bs
+from benchmarks.synthetic import write_ann_file
+from benchmarks.timing import best_of
+from bratiaa.parser import parse_ann_file
+
+
+def parse_with_annotations(path):
+    with bs.Annotations(path.as_posix(), read_only=True) as annotations:
+        return (list(annotations.get_textbounds()), list(annotations.get_attributes()),
+                list(annotations.get_relations()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entities', type=int, default=20000, help='Number of text-bound annotations')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of repetitions (best time is reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'large.ann'
+        lines = write_ann_file(path, args.entities)
+        for name, func in [('Annotations', parse_with_annotations), ('parse_ann_file', parse_ann_file)]:
+            seconds = best_of(func, path, repeat=args.repeat)
+            print(f'{name:>16}: {seconds:.3f} s ({lines / seconds:,.0f} lines/s)')
+
+
+if __name__ == '__main__':
+    main()
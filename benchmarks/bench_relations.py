@@ -0,0 +1,40 @@
+"""
+Measures how the relation and polarity readers of bratiaa.evaluation scale with the number of annotations per file.
+Time per annotation should stay roughly constant when doubling the file size.
+
+    python -m benchmarks.bench_relations --entities 1000 --steps 4
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import DEFAULT_SPEC, write_ann_file
+from benchmarks.timing import best_of
+from bratiaa.evaluation import ASPECT_LABELS, _read_polarities, _read_relations
+from bratiaa.parser import parse_ann_file
+
+# every entity is an aspect with an attribute and related to the next one
+SPEC = DEFAULT_SPEC._replace(labels=list(ASPECT_LABELS), attributes=1.0, relations=1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entities', type=int, default=1000, help='Number of text-bound annotations of first step')
+    parser.add_argument('--steps', type=int, default=5, help='Number of times the number of entities is doubled')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of repetitions (best time is reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'large.ann'
+        for step in range(args.steps):
+            num_entities = args.entities * 2 ** step
+            write_ann_file(path, num_entities, SPEC)
+            parsed = parse_ann_file(path)  # parsing is measured by bench_parser
+            for name, func in [('relations', _read_relations), ('polarities', _read_polarities)]:
+                seconds = best_of(func, parsed, repeat=args.repeat)
+                print(f'{name:>10} {num_entities:>9,} entities: {seconds:.4f} s '
+                      f'({seconds / num_entities * 1e6:.2f} µs/entity)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark suite running the stages of an agreement computation on a synthetic project (see benchmarks.synthetic)
+and writing wall time and peak RSS of each benchmark as JSON. Every benchmark runs in a fresh process, so its peak
+RSS is not inflated by the benchmarks before it.
+
+    python -m benchmarks.suite --documents 200 --annotators 5 --output results.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from itertools import combinations
+from pathlib import Path
+
+from benchmarks.bench_parser import parse_with_annotations
+from benchmarks.synthetic import generate_project, spec_arguments, spec_from_args
+from benchmarks.timing import best_of
+
+
+def bench_input_generator(root):
+    from bratiaa.agree import input_generator
+    return lambda: list(input_generator(root))
+
+
+def bench_annotations(root):
+    ann_paths = sorted(Path(root).glob('*/*.ann'))
+    return lambda: [parse_with_annotations(path) for path in ann_paths]
+
+
+def bench_parse_ann_file(root):
+    from bratiaa.parser import parse_ann_file
+    ann_paths = sorted(Path(root).glob('*/*.ann'))
+    return lambda: [parse_ann_file(path) for path in ann_paths]
+
+
+def bench_token_overlap(root):
+    from bratiaa.utils import read, tokenize, TokenOverlap
+    texts = [read(path) for path in sorted(Path(root).glob('*/*.txt'))]
+    return lambda: [TokenOverlap(text, list(tokenize(text))) for text in texts]
+
+
+def _bench_eval_func(name, with_tokens=False):
+    def bench(root):
+        import bratiaa.evaluation as evaluation
+        from bratiaa.agree import input_generator
+        from bratiaa.utils import read, tokenize, TokenOverlap
+        eval_func = getattr(evaluation, name)
+        jobs = []
+        for document in input_generator(root):
+            tokens = None
+            if with_tokens:
+                text = read(document.txt_path)
+                tokens = TokenOverlap(text, list(tokenize(text)))
+            for (_, path_1), (_, path_2) in combinations(document.ann_files, 2):
+                jobs.append((path_1, path_2, tokens))
+        return lambda: [eval_func(path_1, path_2, tokens=tokens) for path_1, path_2, tokens in jobs]
+
+    return bench
+
+
+def bench_f1_agreement(root):
+    from bratiaa.agree import compute_f1_agreement
+    return lambda: compute_f1_agreement(root)
+
+
+def bench_f1_agreement_tokens(root):
+    from bratiaa.agree import compute_f1_agreement
+    from bratiaa.utils import tokenize
+    return lambda: compute_f1_agreement(root, token_func=tokenize)
+
+
+def bench_iaa_report(root):
+    from bratiaa.agree import compute_f1_agreement, iaa_report
+    f1_agreement = compute_f1_agreement(root)
+
+    def report():
+        with redirect_stdout(io.StringIO()):
+            iaa_report(f1_agreement)
+
+    return report
+
+
+# name -> function taking the project root and returning the callable to time (set up outside of the timing)
+BENCHMARKS = {
+    'input_generator': bench_input_generator,
+    'Annotations': bench_annotations,
+    'parse_ann_file': bench_parse_ann_file,
+    'TokenOverlap': bench_token_overlap,
+    'exact_match_instance_evaluation': _bench_eval_func('exact_match_instance_evaluation'),
+    'exact_match_token_evaluation': _bench_eval_func('exact_match_token_evaluation', with_tokens=True),
+    'exact_match_instance_polarity_evaluation': _bench_eval_func('exact_match_instance_polarity_evaluation'),
+    'exact_match_instance_relation_evaluation': _bench_eval_func('exact_match_instance_relation_evaluation'),
+    'F1Agreement': bench_f1_agreement,
+    'F1Agreement (tokens)': bench_f1_agreement_tokens,
+    'iaa_report': bench_iaa_report,
+}
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of the current process (None where the resource module is not available).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def run_benchmark(name, root, repeat):
+    """
+    Returns best wall time of repeat runs and peak RSS of the current process.
+    """
+    seconds = best_of(BENCHMARKS[name](root), repeat=repeat)
+    return {'name': name, 'seconds': seconds, 'peak_rss_bytes': peak_rss_bytes()}
+
+
+def run_suite(root, names=None, repeat=3):
+    """
+    Runs given benchmarks (default: all) on the project at root, each in a fresh process.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for name in names or BENCHMARKS:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(run_benchmark, (name, root, repeat)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    spec_arguments(parser)
+    parser.add_argument('--project', default=None,
+                        help='Existing project to benchmark on (default: generate a synthetic one)')
+    parser.add_argument('--benchmark', action='append', choices=list(BENCHMARKS), dest='names',
+                        help='Benchmark to run (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of repetitions (best time is reported)')
+    parser.add_argument('--output', default=None, help='JSON file to write the results to (default: stdout)')
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.project
+        if root is None:
+            root = Path(tmp_dir, 'project').as_posix()
+            generate_project(root, spec)
+        results = run_suite(root, args.names, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'project': args.project or spec._asdict(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fout:
+            json.dump(report, fout, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Generator for synthetic brat projects of configurable size and shape.
+
+    python -m benchmarks.synthetic /tmp/project --annotators 4 --documents 100 --tokens 500
+"""
+import argparse
+import random
+from collections import namedtuple
+from pathlib import Path
+
+from bratiaa.evaluation import ASPECT_LABELS
+
+ProjectSpec = namedtuple('ProjectSpec', ['annotators', 'documents', 'tokens', 'labels', 'density', 'agreement',
+                                         'discontinuous', 'attributes', 'relations', 'seed'])
+
+DEFAULT_SPEC = ProjectSpec(
+    annotators=3,
+    documents=50,
+    tokens=300,  # tokens per document
+    labels=list(ASPECT_LABELS) + ['PER', 'LOC', 'ORG', 'MISC'],
+    density=0.2,  # reference annotations per token
+    agreement=0.8,  # probability that an annotator reproduces a reference annotation exactly
+    discontinuous=0.05,  # probability of an annotation consisting of two fragments
+    attributes=0.3,  # probability of an annotation having a polarity attribute
+    relations=0.2,  # probability of an annotation being related to the next one
+    seed=0,
+)
+
+WORDS = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do', 'eiusmod',
+         'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore', 'magna', 'aliqua', '.', ',']
+
+ANNOTATION_CONF = '''[entities]
+{entities}
+
+[relations]
+Target\tArg1:<ENTITY>, Arg2:<ENTITY>
+
+[events]
+
+[attributes]
+Polarity\tArg:<ENTITY>, Value:0|1
+Untargeted\tArg:<ENTITY>, Value:YES
+'''
+
+
+def generate_project(root, spec=DEFAULT_SPEC):
+    """
+    Writes a brat project with one subdirectory per annotator to root. All annotators annotate all documents: each
+    reproduces a shared set of reference annotations with probability spec.agreement and otherwise shifts its
+    boundaries, changes its label or leaves it out.
+    """
+    rng = random.Random(spec.seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / 'annotation.conf').write_text(ANNOTATION_CONF.format(entities='\n'.join(spec.labels)), encoding='utf-8')
+    annotators = [f'annotator-{i:03d}' for i in range(spec.annotators)]
+    for annotator in annotators:
+        (root / annotator).mkdir(exist_ok=True)
+    for doc in range(spec.documents):
+        text, tokens = _text(rng, spec.tokens)
+        reference = _reference_annotations(rng, tokens, spec)
+        for annotator in annotators:
+            name = f'doc-{doc:05d}'
+            (root / annotator / (name + '.txt')).write_text(text, encoding='utf-8')
+            annotations = [_perturb(rng, a, tokens, spec) for a in reference]
+            (root / annotator / (name + '.ann')).write_text(_ann_lines(rng, annotations, text, spec),
+                                                            encoding='utf-8')
+    return annotators
+
+
+def write_ann_file(path, num_entities, spec=DEFAULT_SPEC):
+    """
+    Writes a single ANN file with num_entities one-token annotations of a synthetic text (with attributes and
+    relations as often as spec gives), e.g. for benchmarking readers on large files. Returns the number of lines.
+    """
+    rng = random.Random(spec.seed)
+    text, _ = _text(rng, 2 * num_entities)
+    lines = _ann_lines(rng, [(rng.choice(spec.labels), [(2 * i, 2 * i)]) for i in range(num_entities)], text, spec)
+    Path(path).write_text(lines, encoding='utf-8')
+    return lines.count('\n')
+
+
+def _text(rng, num_tokens):
+    words = [rng.choice(WORDS) for _ in range(num_tokens)]
+    tokens, offset = [], 0
+    for word in words:
+        tokens.append((offset, offset + len(word)))
+        offset += len(word) + 1
+    return ' '.join(words) + '\n', tokens
+
+
+def _reference_annotations(rng, tokens, spec):
+    """
+    Non-overlapping (label, [(first token, last token), ...]) annotations.
+    """
+    annotations = []
+    i = 0
+    while i < len(tokens):
+        if rng.random() < spec.density:
+            length = rng.randint(1, 3)
+            last = min(i + length - 1, len(tokens) - 1)
+            fragments = [(i, last)]
+            if rng.random() < spec.discontinuous and last + 2 < len(tokens):
+                # second fragment after a gap of one token
+                fragments.append((last + 2, last + 2))
+                last += 2
+            annotations.append((rng.choice(spec.labels), fragments))
+            i = last + 2
+        else:
+            i += 1
+    return annotations
+
+
+def _perturb(rng, annotation, tokens, spec):
+    if rng.random() < spec.agreement:
+        return annotation
+    label, fragments = annotation
+    choice = rng.random()
+    if choice < 1 / 3:
+        return None  # missed by this annotator
+    if choice < 2 / 3:
+        return rng.choice(spec.labels), fragments
+    first, last = fragments[0]
+    return label, [(first, min(last + 1, len(tokens) - 1))] + fragments[1:]
+
+
+def _ann_lines(rng, annotations, text, spec):
+    # token offsets of the text are recomputed from the text, so annotations can refer to token indices
+    offsets, offset = [], 0
+    for word in text.rstrip('\n').split(' '):
+        offsets.append((offset, offset + len(word)))
+        offset += len(word) + 1
+    lines = []
+    ids = [i + 1 for i, a in enumerate(a for a in annotations if a is not None)]
+    annotations = [a for a in annotations if a is not None]
+    num_attributes = num_relations = 0
+    for tid, (label, fragments) in zip(ids, annotations):
+        spans = [(offsets[first][0], offsets[last][1]) for first, last in fragments]
+        span_str = ';'.join(f'{start} {end}' for start, end in spans)
+        covered = ' '.join(text[start:end] for start, end in spans)
+        lines.append(f'T{tid}\t{label} {span_str}\t{covered}')
+        if rng.random() < spec.attributes:
+            num_attributes += 1
+            if rng.random() < 0.8:
+                lines.append(f'A{num_attributes}\tPolarity T{tid} {rng.randint(0, 1)}')
+            else:
+                lines.append(f'A{num_attributes}\tUntargeted T{tid} YES')
+        if rng.random() < spec.relations and tid < len(annotations):
+            num_relations += 1
+            lines.append(f'R{num_relations}\tTarget Arg1:T{tid} Arg2:T{tid + 1}\t')
+    return '\n'.join(lines) + '\n'
+
+
+def spec_arguments(parser):
+    """
+    Adds one command line argument per ProjectSpec field to given argparse parser.
+    """
+    for field, default in DEFAULT_SPEC._asdict().items():
+        if field == 'labels':
+            parser.add_argument('--labels', type=int, default=len(default), help='Number of labels')
+        else:
+            parser.add_argument(f'--{field}', type=type(default), default=default)
+
+
+def spec_from_args(args):
+    labels = DEFAULT_SPEC.labels
+    labels = labels[:args.labels] if args.labels <= len(labels) else \
+        labels + [f'LABEL{i}' for i in range(len(labels), args.labels)]
+    return ProjectSpec(**{field: labels if field == 'labels' else getattr(args, field) for field in ProjectSpec._fields})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root', help='Directory to write the project to')
+    spec_arguments(parser)
+    args = parser.parse_args()
+    generate_project(args.root, spec_from_args(args))
+
+
+if __name__ == '__main__':
+    main()
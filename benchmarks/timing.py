@@ -0,0 +1,16 @@
+"""
+Timing helper shared by the benchmarks.
+"""
+import time
+
+
+def best_of(func, *args, repeat=3):
+    """
+    Best wall time of repeat calls of func(*args).
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
@@ -1,2 +1,4 @@
-from bratiaa.agree import compute_f1_agreement, iaa_report, AnnFile, F1Agreement, Document
+from bratiaa.agree import compute_f1_agreement, compute_f1_agreements, iaa_report, AnnFile, F1Agreement, Document, ProjectIndex
 from bratiaa.evaluation import exact_match_instance_evaluation, exact_match_token_evaluation, Annotation
+from bratiaa.filters import AnnotationFilter
+from bratiaa.export import export_counts, load_agreement
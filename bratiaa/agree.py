@@ -1,25 +1,44 @@
 import logging
-from itertools import combinations
+import multiprocessing
+import os
+import pickle
+import warnings
+from collections import Counter, deque
+from itertools import combinations, islice
+from operator import attrgetter
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 from functools import partial
-from scipy.special import comb
-from tabulate import tabulate
 
+from bratiaa import profiling
+from bratiaa.cache import ParseCache
+from bratiaa.counts import create_counts, DOCUMENT_CHUNK_SIZE, MAX_DENSE_BYTES
 from bratiaa.evaluation import *
+from bratiaa.messages import collect_messages, LOG_LEVELS
+from bratiaa.heatmap import draw_heatmap, write_png, MAX_ANNOTATED_SIZE
+from bratiaa.parser import parse_ann_file
 from bratiaa.utils import read, TokenOverlap
 from bratsubset.projectconfig import ProjectConfiguration
 
-from setuptools.namespaces import flatten
-from sklearn.metrics import cohen_kappa_score
-
 # attempted division by zero is expected and unproblematic -> NaN
 np.seterr(divide='ignore', invalid='ignore')
 
 AnnFile = namedtuple('AnnFile', ['annotator_id', 'ann_path'])
 
+# bootstrap confidence intervals (low and high are arrays for per_label and per_pair)
+Interval = namedtuple('Interval', ['low', 'high'])
+BootstrapCI = namedtuple('BootstrapCI', ['total', 'per_label', 'per_pair'])
+
+# number of documents sent to a worker process at once
+WORKER_CHUNK_SIZE = 16
+
+# resamples are drawn in batches whose weights take about this many bytes
+BOOTSTRAP_BATCH_BYTES = 2 ** 26
+
+# marks random bytes that do not decide a Poisson count on their own
+UNDECIDED = 255
+
 
 class Document:
     __slots__ = ['ann_files', 'txt_path', 'doc_id']
@@ -33,20 +52,87 @@ class Document:
         self.ann_files = []
 
 
+FileStat = namedtuple('FileStat', ['size', 'mtime_ns'])
+
+
+class ProjectIndex:
+    """
+    Annotators, agreement documents and file stats of an annotation project, collected in a single directory walk
+    (each first-level subdirectory is one annotator). Calling the index yields Document objects like input_generator.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.stats = {}  # (annotator, relative path) -> FileStat
+        with profiling.stage('index'):
+            annotators = sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+            assert len(annotators) > 1, 'At least two annotators are necessary to compute agreement!'
+            intersection = None
+            for annotator in annotators:
+                ann_paths = set()
+                for rel_path, stat in _scan_files(self.root / annotator):
+                    self.stats[(annotator, rel_path)] = FileStat(stat.st_size, stat.st_mtime_ns)
+                    if rel_path.endswith('.ann'):
+                        ann_paths.add(rel_path)
+                intersection = ann_paths if intersection is None else intersection & ann_paths
+        self.annotators = annotators
+        self.documents = sorted(intersection)
+
+    def __call__(self):
+        for rel_path in self.documents:
+            yield self.document(rel_path)
+
+    def document(self, doc_id):
+        document = Document((self.root / self.annotators[0] / doc_id).as_posix()[:-3] + 'txt', doc_id=doc_id)
+        for annotator in self.annotators:
+            document.ann_files.append(AnnFile(annotator, self.root / annotator / doc_id))
+        return document
+
+    def changed_documents(self, other):
+        """
+        Compares with a newer index of the same project. Returns a dict mapping the ids of changed documents to the
+        annotators whose files changed (all annotators if the text changed) or None if annotators or documents
+        have been added or removed.
+        """
+        if (self.annotators, self.documents) != (other.annotators, other.documents):
+            return None
+        documents = set(self.documents)
+        changed = {}
+        for key in self.stats.keys() | other.stats.keys():
+            if self.stats.get(key) == other.stats.get(key):
+                continue
+            annotator, rel_path = key
+            doc_id = rel_path[:-3] + 'ann'
+            if doc_id not in documents:
+                continue
+            if rel_path.endswith('.txt'):
+                # only the first annotator's text is read
+                if annotator == self.annotators[0]:
+                    changed.setdefault(doc_id, set()).update(self.annotators)
+            else:
+                changed.setdefault(doc_id, set()).add(annotator)
+        return changed
+
+
+def _scan_files(directory, prefix=''):
+    """
+    Recursively yields (relative path, stat) of all ANN and TXT files below given directory.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if entry.is_dir():
+                yield from _scan_files(entry.path, rel_path + '/')
+            elif entry.name.endswith(('.ann', '.txt')):
+                yield rel_path, entry.stat()
+
+
 def input_generator(root):
     """
     Yields Document objects. Assumes that each first-level subdirectory of the
     annotation project corresponds to one annotator.
     """
-    root = Path(root)
-    annotators = [subdir.parts[-1] for subdir in root.glob('*/') if subdir.is_dir()]
-    assert len(annotators) > 1, 'At least two annotators are necessary to compute agreement!'
-    for rel_path in sorted(collect_redundant_files(root, annotators)):
-        document = Document((root / annotators[0] / rel_path).as_posix()[:-3] + 'txt', doc_id=rel_path)
-        for annotator in annotators:
-            ann_path = root / annotator / rel_path
-            document.ann_files.append(AnnFile(annotator, ann_path))
-        yield document
+    yield from ProjectIndex(root)()
 
 
 def collect_redundant_files(root, annotators):
@@ -54,19 +140,22 @@ def collect_redundant_files(root, annotators):
     for annotator in annotators:
         subdir_path = root / annotator
         relative_paths = {path.relative_to(subdir_path).as_posix() for path in subdir_path.glob('**/*.ann')}
-        if not intersection:
+        if intersection is None:
             intersection = relative_paths
         else:
-            intersection.intersection(relative_paths)
+            intersection = intersection.intersection(relative_paths)
     return intersection
 
 
 def _collect_annotators_and_documents(input_gen):
+    if isinstance(input_gen, ProjectIndex):
+        return list(input_gen.annotators), list(input_gen.documents)
     annotators, documents = set(), []
-    for document in input_gen():
-        for ann_file in document.ann_files:
-            annotators.add(ann_file.annotator_id)
-        documents.append(document.doc_id)
+    with profiling.stage('index'):
+        for document in input_gen():
+            for ann_file in document.ann_files:
+                annotators.add(ann_file.annotator_id)
+            documents.append(document.doc_id)
     return list(annotators), documents
 
 
@@ -74,34 +163,220 @@ def compute_f1(tp, total):
     return (2 * tp) / total
 
 
+class DocumentCounter:
+    """
+    Computes the (pair, count, label) block of true positives and totals for a single document. Holds everything
+    needed for counting, so that it can be shipped to worker processes once.
+    """
+
+    def __init__(self, pair2idx, label2idx, eval_func, token_func=None, cache=None, annotators=None,
+                 annotation_filter=None):
+        self.num_pairs = len(set(pair2idx.values()))
+        self.pair2idx = pair2idx
+        self.label2idx = label2idx
+        self.eval_func = eval_func
+        self.token_func = token_func
+        self.cache = cache  # optional ParseCache
+        self.annotators = annotators  # if given, only pairs involving these annotators are counted
+        self.annotation_filter = annotation_filter  # applied while parsing ANN files
+
+    def __call__(self, document):
+        """
+        Returns the document id, its count block and the messages emitted while counting it.
+        """
+        with profiling.document(document.doc_id), collect_messages() as messages:
+            block = self.count(document)
+        return document.doc_id, block, messages
+
+    def count(self, document, overlaps=None, parsed=None):
+        """
+        Returns the count block of given document. Counters of the same document can share the optional dicts of
+        tokenized texts (overlaps) and parsed ANN files (parsed).
+        """
+        overlaps = {} if overlaps is None else overlaps
+        if self.token_func and self.token_func not in overlaps:
+            overlaps[self.token_func] = self._token_overlap(document.txt_path)
+        to = overlaps.get(self.token_func)
+        # (p, c, l) counts of this document
+        block = np.zeros((self.num_pairs, 2, len(self.label2idx)), dtype=np.int64)
+        loaded = [self._load(ann_file.ann_path, parsed) for ann_file in document.ann_files]
+        phases = counts_only(self.eval_func)
+        if phases:
+            # count per label directly on integer-encoded annotations
+            read_counts, compare_counts = phases
+            vocabulary = {}
+            def read_phase(ann):
+                return read_counts(ann, to, self._label_ids, vocabulary)
+        else:
+            # parse each annotator's file once, compare the in-memory annotations pair-wise
+            read_annotations, compare = two_phase(self.eval_func)
+            def read_phase(ann):
+                return read_annotations(ann, to)
+        annotations = []
+        with profiling.stage('read'):
+            for ann_file, ann in zip(document.ann_files, loaded):
+                try:
+                    annotations.append(read_phase(ann))
+                except TargetNotFoundError as e:
+                    # read phases only see the parsed annotations, so name the file here
+                    e.ann_path = e.ann_path or ann_file.ann_path
+                    raise
+        with profiling.stage('evaluate'):
+            for (anno_file_1, exp), (anno_file_2, pred) in combinations(zip(document.ann_files, annotations), 2):
+                if self.annotators and not {anno_file_1.annotator_id, anno_file_2.annotator_id} & self.annotators:
+                    continue
+                pair_idx = self.pair2idx[(anno_file_1.annotator_id, anno_file_2.annotator_id)]
+                if phases:
+                    tp, exp, pred = compare_counts(exp, pred, len(self.label2idx))
+                    block[pair_idx, 0] += tp
+                    block[pair_idx, 1] += exp + pred
+                    continue
+                tp, exp, pred = compare(exp, pred)
+                self._increment_counts(tp, block[pair_idx], 0)
+                self._increment_counts(exp, block[pair_idx], 1)
+                self._increment_counts(pred, block[pair_idx], 1)
+        return block
+
+    def _token_overlap(self, txt_path):
+        profiling.count('texts')
+        if self.cache:
+            # cached texts are read together with their tokens
+            with profiling.stage('tokenize'):
+                text, tokens = self.cache.tokenize(txt_path, self.token_func)
+                return TokenOverlap(text, tokens)
+        with profiling.stage('read_text'):
+            text = read(txt_path)
+        with profiling.stage('tokenize'):
+            return TokenOverlap(text, list(self.token_func(text)))
+
+    def _load(self, ann_path, parsed=None):
+        # only the built-in read phases know how to handle parsed annotations
+        if not hasattr(self.eval_func, 'read'):
+            return ann_path
+        parsed = {} if parsed is None else parsed
+        key = (ann_path, None if self.annotation_filter is None else self.annotation_filter.key)
+        if key not in parsed:
+            with profiling.stage('parse'):
+                if self.cache:
+                    parsed[key] = self.cache.parse_ann_file(ann_path, self.annotation_filter)
+                else:
+                    parsed[key] = parse_ann_file(ann_path, self.annotation_filter)
+            if profiling.active_profile():
+                ann = parsed[key]
+                profiling.count('ann_files')
+                profiling.count('textbounds', len(ann.textbounds))
+                profiling.count('attributes', len(ann.attributes))
+                profiling.count('relations', len(ann.relations))
+        return parsed[key]
+
+    def _increment_counts(self, annotations, cl, kind):
+        # count labels at C speed, then map the few distinct labels to their ids
+        label_counts = Counter(map(attrgetter('label'), annotations))
+        np.add.at(cl[kind], self._label_ids(label_counts), list(label_counts.values()))
+
+    def _label_ids(self, labels):
+        ids = []
+        for label in labels:
+            try:
+                ids.append(self.label2idx[label])
+            except KeyError:
+                logging.error(
+                    f'Encountered unknown label "{label}"! Please make sure that your "annotation.conf" '
+                    f'(https://brat.nlplab.org/configuration.html#annotation-configuration) '
+                    f'is located under the project root and contains an exhaustive list of entities!'
+                )
+                raise
+        return ids
+
+
+class MultiDocumentCounter:
+    """
+    Computes the count blocks of several DocumentCounters for a single document, tokenizing its text once per token
+    function and parsing each ANN file only once.
+    """
+
+    def __init__(self, counters):
+        self.counters = counters
+
+    def __call__(self, document):
+        overlaps, parsed = {}, {}
+        with profiling.document(document.doc_id), collect_messages() as messages:
+            blocks = [counter.count(document, overlaps, parsed) for counter in self.counters]
+        return document.doc_id, blocks, messages
+
+
+_worker_counter = None
+_worker_profiling = False
+
+
+def _init_worker(counter, profile=False):
+    global _worker_counter, _worker_profiling
+    _worker_counter = counter
+    _worker_profiling = profile
+
+
+def _count_in_worker(documents):
+    """
+    Returns the counter's results for given documents and, if profiling, the Profile recorded while counting them.
+    """
+    if not _worker_profiling:
+        return [_worker_counter(document) for document in documents], None
+    with profiling.profiling() as profile:
+        return [_worker_counter(document) for document in documents], profile
+
+
+def _process_pool(workers, counter, profile=False):
+    """
+    Process pool whose workers share the given counter (and record profiles if profile is set). Counters with
+    unpicklable callables (lambdas, closures) are inherited by forking, where the platform supports it.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    context = None
+    try:
+        pickle.dumps(counter)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError('Parallel agreement computation requires picklable (module-level) eval_func and '
+                             'token_func on this platform!')
+        context = multiprocessing.get_context('fork')
+    return ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(counter, profile))
+
+
 class F1Agreement:
     def __init__(self, input_gen, labels, eval_func=exact_match_instance_evaluation, token_func=None, annotators=None,
-                 documents=None):
-        if not (annotators and documents):
+                 documents=None, workers=1, backend=None, cache=None, annotation_filter=None, count=True,
+                 document_sink=None):
+        if annotators is None or documents is None:
             annotators, documents = _collect_annotators_and_documents(input_gen)
             annotators.sort()
             documents.sort()
         assert len(annotators) > 1, 'At least two annotators are necessary to compute agreement!'
-        num_pairs = comb(len(annotators), 2, exact=True)
         self.exp_final=[]
         self.pred_final=[]        
         # (p, d, c, l) where p := annotator pairs, d := documents, c := counts (tp, total = 2*tp+fp+fn), l := labels
-        self._pdcl = np.zeros((num_pairs, len(documents), 2, len(labels)))
+        # stored densely or sparsely depending on its size (see bratiaa.counts)
+        self._pairs = [pair for pair in combinations(annotators, 2)]
+        self._pdcl = create_counts(len(self._pairs), len(documents), len(labels), backend=backend)
         self._documents = list(documents)
-        self._doc2idx = {d: i for i, d in enumerate(documents)}
+        # document index (not needed if only counts summed over documents are kept)
+        self._doc2idx = {d: i for i, d in enumerate(documents)} if self._pdcl.per_document else None
         self._labels = list(labels)
         self._label2idx = {l: i for i, l in enumerate(labels)}
         self._annotators = list(annotators)
-        self._pairs = [pair for pair in combinations(annotators, 2)]
         self._pair2idx = {p: i for i, p in enumerate(self._pairs)}
         # add pairs in reverse order (same index)
         for (a1, a2), value in self._pair2idx.copy().items():
             self._pair2idx[(a2, a1)] = value
         self._eval_func = eval_func  # function used to extract true positives, false positives and false negatives
         self._token_func = token_func  # function used for tokenization
-        self._compute_tp_total(input_gen)
-
-        
+        self._workers = workers  # number of processes counting documents in parallel
+        self._cache = cache  # optional ParseCache for parsed ANN files and tokenized texts
+        self._annotation_filter = annotation_filter  # CompiledFilter applied to ANN files (if any)
+        self._input_gen = input_gen
+        self._document_sink = document_sink  # optional callable receiving (document id, mean F1, SD F1) when counted
+        self.messages = {}  # document id -> Messager messages emitted while counting it (only with per-document counts)
+        if count:  # otherwise counts are left empty to be filled by the caller (cf. compute_f1_agreements)
+            self._compute_tp_total(input_gen)
 
     @property
     def annotators(self):
@@ -115,48 +390,98 @@ class F1Agreement:
     def labels(self):
         return list(self._labels)
 
+    @property
+    def pairs(self):
+        return list(self._pairs)
+
+    @property
+    def has_document_counts(self):
+        """
+        False if only counts summed over documents are kept (count backend 'aggregate').
+        """
+        return self._pdcl.per_document
+
+    def _document_counter(self, annotators=None):
+        return DocumentCounter(self._pair2idx, self._label2idx, self._eval_func, self._token_func, self._cache,
+                               annotators=annotators, annotation_filter=self._annotation_filter)
+
     def _compute_tp_total(self, input_gen):
-        exp_total=[]
-        pred_total=[]
-        for doc_index, document in enumerate(input_gen()):
+        counter = self._document_counter()
+        for doc_index, (doc_id, block, messages) in enumerate(self._count_documents(counter, input_gen())):
             assert doc_index < len(self._documents), 'Input generator yields more documents than expected!'
-            to = None
-            if self._token_func:
-                text = read(document.txt_path)
-                tokens = list(self._token_func(text))
-                to = TokenOverlap(text, tokens)
-            for anno_file_1, anno_file_2 in combinations(document.ann_files, 2):
-#                 tp, exp, pred, exp_list, pred_list = self._eval_func(anno_file_1.ann_path, anno_file_2.ann_path, tokens=to)
-                tp, exp, pred = self._eval_func(anno_file_1.ann_path, anno_file_2.ann_path, tokens=to)
-#                 exp_total.append(exp_list)
-#                 pred_total.append(pred_list)
-                pair_idx = self._pair2idx[(anno_file_1.annotator_id, anno_file_2.annotator_id)]
-                doc_idx = self._doc2idx[document.doc_id]
-                self._increment_counts(tp, pair_idx, doc_idx, 0)
-                self._increment_counts(exp, pair_idx, doc_idx, 1)
-                self._increment_counts(pred, pair_idx, doc_idx, 1)
-                
-#         self.exp_final=list(flatten(exp_total))
-#         self.pred_final=list(flatten(pred_total))
-        
-                
-    def _increment_counts(self, annotations, pair, doc, kind):
-        for a in annotations:
-            try:
-                self._pdcl[pair][doc][kind][self._label2idx[a.label]] += 1
-            except KeyError:
-                logging.error(
-                    f'Encountered unknown label "{a.label}"! Please make sure that your "annotation.conf" '
-                    f'(https://brat.nlplab.org/configuration.html#annotation-configuration) '
-                    f'is located under the project root and contains an exhaustive list of entities!'
-                )
-                raise
+            self._add_document(doc_id, block, messages)
+
+    def _add_document(self, doc_id, block, messages):
+        with profiling.stage('accumulate'):
+            self._pdcl.add(self._doc2idx[doc_id] if self._doc2idx is not None else None, block)
+        self._set_messages(doc_id, messages)
+        if self._document_sink:
+            pc = np.sum(block, axis=2)  # sum over labels
+            self._document_sink(doc_id, *self._mean_sd(compute_f1(pc[:, 0], pc[:, 1])))
+
+    def update(self, changed_documents, annotators=None):
+        """
+        Recomputes the counts of the given documents (ids or Document objects), only of pairs involving one of the
+        given annotators (if any).
+        """
+        if not self._pdcl.per_document:
+            raise ValueError('Documents cannot be updated without per-document counts (count backend "aggregate")!')
+        if self._input_gen is None:
+            raise ValueError('Loaded agreement has no corpus to update documents from!')
+        doc_ids = [d.doc_id if isinstance(d, Document) else d for d in changed_documents]
+        for doc_id in doc_ids:
+            assert doc_id in self._doc2idx, f'Unknown document "{doc_id}"!'
+        annotators = set(annotators) if annotators else None
+        counter = self._document_counter(annotators)
+        touched_pairs = [i for i, pair in enumerate(self._pairs) if not annotators or set(pair) & annotators]
+        for doc_id, block, messages in self._count_documents(counter, self._lookup_documents(doc_ids)):
+            self._set_messages(doc_id, messages)
+            doc = self._doc2idx[doc_id]
+            with profiling.stage('accumulate'):
+                new_block = self._pdcl.document(doc)
+                new_block[touched_pairs] = block[touched_pairs]
+                self._pdcl.set(doc, new_block)
+
+    def _lookup_documents(self, doc_ids):
+        if isinstance(self._input_gen, ProjectIndex):
+            return [self._input_gen.document(doc_id) for doc_id in doc_ids]
+        wanted = set(doc_ids)
+        return [document for document in self._input_gen() if document.doc_id in wanted]
+
+    def _set_messages(self, doc_id, messages):
+        if self._doc2idx is None:
+            for message in messages:
+                logging.log(LOG_LEVELS.get(message.type, logging.INFO), f'{doc_id}: {message.text}')
+        elif messages:
+            self.messages[doc_id] = messages
+        else:
+            self.messages.pop(doc_id, None)
+
+    def _count_documents(self, counter, documents):
+        """
+        Yields (document id, count block, messages) for given documents, sharded across a process pool if workers > 1.
+        """
+        if self._workers <= 1:
+            yield from map(counter, documents)
+            return
+        documents = iter(documents)
+        chunks = iter(lambda: list(islice(documents, WORKER_CHUNK_SIZE)), [])
+        profile = profiling.active_profile()
+        with _process_pool(self._workers, counter, profile is not None) as pool:
+            # only a few chunks per worker are in flight, documents are taken from the input as they are needed
+            pending = deque(pool.submit(_count_in_worker, chunk) for chunk in islice(chunks, self._workers * 2))
+            while pending:
+                results, worker_profile = pending.popleft().result()
+                pending.extend(pool.submit(_count_in_worker, chunk) for chunk in islice(chunks, 1))
+                if worker_profile is not None:
+                    profile.merge(worker_profile)
+                yield from results
 
     def mean_sd_per_label(self):
         """
         Mean and standard deviation of all annotator combinations' F1 scores by label.
         """
-        pcl = np.sum(self._pdcl, axis=1)  # sum over documents
+        pcl = self._pdcl.sum_documents()  # sum over documents
         f1_pairs = compute_f1(pcl[:, 0], pcl[:, 1])
         avg, stddev = self._mean_sd(f1_pairs)
         return avg, stddev
@@ -165,16 +490,22 @@ class F1Agreement:
         """
         Mean and standard deviation of all annotator combinations' F1 scores per document.
         """
-        pdc = np.sum(self._pdcl, axis=3)  # sum over labels
-        f1_pairs = compute_f1(pdc[:, :, 0], pdc[:, :, 1])
-        avg, stddev = self._mean_sd(f1_pairs)
-        return avg, stddev
+        avg, stddev = [np.zeros(0)], [np.zeros(0)]  # (empty for projects without documents)
+        # reduce chunks of documents to keep memory bounded for large projects
+        for start in range(0, len(self._documents), DOCUMENT_CHUNK_SIZE):
+            stop = min(start + DOCUMENT_CHUNK_SIZE, len(self._documents))
+            pdc = self._pdcl.sum_labels(start, stop)  # sum over labels
+            f1_pairs = compute_f1(pdc[:, :, 0], pdc[:, :, 1])
+            chunk_avg, chunk_stddev = self._mean_sd(f1_pairs)
+            avg.append(chunk_avg)
+            stddev.append(chunk_stddev)
+        return np.concatenate(avg), np.concatenate(stddev)
 
     def mean_sd_total(self):
         """
         Mean and standard deviation of all annotator cominations' F1 scores.
         """
-        pc = np.sum(self._pdcl, axis=(1, 3))  # sum over documents and labels
+        pc = np.sum(self._pdcl.sum_documents(), axis=2)  # sum over documents and labels
         f1_pairs = compute_f1(pc[:, 0], pc[:, 1])
         avg, stddev = self._mean_sd(f1_pairs)
         return avg, stddev
@@ -183,7 +514,7 @@ class F1Agreement:
         """
         Mean and standard deviation of all annotator combinations' F1 scores involving given annotator per label.
         """
-        pcl = np.sum(self._pdcl, axis=1)  # sum over documents
+        pcl = self._pdcl.sum_documents()  # sum over documents
         pcl = pcl[self._pairs_involving(annotator)]
         f1_pairs = compute_f1(pcl[:, 0], pcl[:, 1])
         avg, stddev = self._mean_sd(f1_pairs)
@@ -193,7 +524,7 @@ class F1Agreement:
         """
         Mean and standard deviation of all annotator combinations' F1 scores involving given annotator.
         """
-        pc = np.sum(self._pdcl, axis=(1, 3))  # sum over documents and labels
+        pc = np.sum(self._pdcl.sum_documents(), axis=2)  # sum over documents and labels
         pc = pc[self._pairs_involving(annotator)]
         f1_pairs = compute_f1(pc[:, 0], pc[:, 1])
         if len(f1_pairs) > 1:
@@ -202,6 +533,40 @@ class F1Agreement:
             avg, stddev = f1_pairs, 0
         return avg, stddev
 
+    def bootstrap_ci(self, n_resamples=1000, level=0.95, by='document', seed=None):
+        """
+        Percentile bootstrap confidence intervals of the mean F1 over annotator pairs (in total and per label) and of
+        each pair's total F1. Documents are resampled with replacement: a batch of resamples is an integer weight
+        matrix (how often each document is drawn), so the resampled counts of the whole batch are a single product
+        with the (document, pair * count * label) count matrix.
+        """
+        if by != 'document':
+            raise ValueError(f'Unknown resampling unit "{by}" (only "document" is supported)!')
+        assert 0 < level < 1, 'Confidence level must be between 0 and 1!'
+        rng = np.random.RandomState(seed)
+        num_pairs, num_documents, num_counts, num_labels = self._pdcl.shape
+        matrix = self._pdcl.document_matrix()
+        # resampled counts are at most num_documents times the largest count, float32 is exact up to 2 ** 24
+        max_count = int(matrix.max()) if matrix.shape[0] * matrix.shape[1] else 0
+        dtype = np.float32 if num_documents * max_count < 2 ** 24 else np.float64
+        matrix = matrix.astype(dtype)
+        if hasattr(matrix, 'toarray') and matrix.shape[0] * matrix.shape[1] * matrix.dtype.itemsize <= MAX_DENSE_BYTES:
+            matrix = matrix.toarray()  # dense products are considerably faster
+        # the random bytes the weights are drawn from take a fraction of the weights' size
+        batch_size = max(1, BOOTSTRAP_BATCH_BYTES // (np.dtype(dtype).itemsize * max(num_documents, 1)))
+        total, per_label, per_pair = [], [], []
+        for start in range(0, n_resamples, batch_size):
+            size = min(batch_size, n_resamples - start)
+            weights = _resample_weights(rng, size, num_documents, dtype)
+            pcl = np.asarray(weights @ matrix, dtype=np.float64).reshape(size, num_pairs, num_counts, num_labels)
+            pc = np.sum(pcl, axis=3)  # sum over labels
+            f1_pairs = compute_f1(pc[:, :, 0], pc[:, :, 1])
+            per_pair.append(f1_pairs)
+            total.append(np.mean(f1_pairs, axis=1))
+            per_label.append(np.mean(compute_f1(pcl[:, :, 0], pcl[:, :, 1]), axis=1))
+        return BootstrapCI(*(_percentile_interval(np.concatenate(stats), level)
+                             for stats in (total, per_label, per_pair)))
+
     def _pairs_involving(self, annotator):
         return [self._pair2idx[(a1, a2)] for (a1, a2) in self._pairs if
                 a1 == annotator or a2 == annotator]
@@ -217,6 +582,7 @@ class F1Agreement:
 
     @staticmethod
     def print_table(row_label_header, row_labels, avg, stddev, precision=3):
+        from tabulate import tabulate
         stats = np.stack((row_labels, avg, stddev)).transpose()
         headers = [row_label_header, 'Mean F1', 'SD F1']
         print(tabulate(stats, headers=headers, tablefmt='github', floatfmt=f'.{precision}f'))
@@ -228,7 +594,7 @@ class F1Agreement:
 
         By definition, the matrix is symmetric and F1 = 1 on the main diagonal.
         """
-        pc = np.sum(self._pdcl, axis=(1, 3))  # sum over documents and labels
+        pc = np.sum(self._pdcl.sum_documents(), axis=2)  # sum over documents and labels
         f1_pairs = compute_f1(pc[:, 0], pc[:, 1])
         num_annotators = len(self._annotators)
         f1_matrix = np.zeros((num_annotators, num_annotators))
@@ -242,55 +608,156 @@ class F1Agreement:
             f1_matrix[i][i] = 1
         return f1_matrix
 
-    def draw_heatmap(self, out_path):
+    def draw_heatmap(self, out_path, max_annotated_size=MAX_ANNOTATED_SIZE, raw=False):
         """
-        Draws heatmap based on square matrix of F1 scores.
+        Draws heatmap based on square matrix of F1 scores. Cells are only annotated with their score for up to
+        max_annotated_size annotators. With raw=True, the matrix is written as plain PNG image without matplotlib,
+        one 4x4 pixel block per cell.
         """
         matrix = self.compute_total_f1_matrix()
-        fig, ax = plt.subplots()
-        im = ax.imshow(matrix)
-        # ticks and labels
-        num_annotators = len(self._annotators)
-        ax.set_xticks(np.arange(num_annotators))
-        ax.set_yticks(np.arange(num_annotators))
-        # show complete grid
-        ax.set_ylim(-0.5, num_annotators - 0.5)
-        ax.set_ylim(num_annotators - 0.5, -0.5)
-        ax.set_xticklabels(self._annotators)
-        ax.set_yticklabels(self._annotators)
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right",
-                 rotation_mode="anchor")
-        for i in range(len(self._annotators)):
-            for j in range(len(self._annotators)):
-                ax.text(j, i, f'{matrix[i, j]:.2f}', ha="center", va="center", color="w")
-
-        # color bar
-        cbar = ax.figure.colorbar(im, ax=ax)
-        cbar.ax.set_ylabel('F1 score', rotation=-90, va="bottom")
-
-        fig.tight_layout()
-        plt.savefig(out_path)
+        if raw:
+            write_png(matrix, out_path)
+        else:
+            draw_heatmap(matrix, self._annotators, out_path, max_annotated_size=max_annotated_size)
 
 
 #     def compute_kappa_score(self):
+#         from sklearn.metrics import cohen_kappa_score
 #         labels = list(set(self.exp_final))
 #         return cohen_kappa_score(self.exp_final, self.pred_final, labels=['PER', 'GENERAL', 'PROFANITY', 'MISC', 'SARCASM', 'VIOLENCE', 'OUTOFSCOPE', 'LOC', 'FEEDBACK'])
         
         
-def compute_f1_agreement(project_root, input_gen=input_generator, token_func=None, eval_func=None):
+def _resample_weights(rng, num_resamples, num_documents, dtype=np.int64):
+    """
+    (resamples, documents) matrix of how often each document is drawn when drawing num_documents times with
+    replacement.
+    """
+    if not num_documents:
+        return np.zeros((num_resamples, 0), dtype=dtype)
+    # independent Poisson counts that sum to s are distributed like s draws with replacement, so each resample is
+    # drawn as Poisson counts (with a mean slightly below one, so s rarely exceeds num_documents) topped up with
+    # num_documents - s draws; this needs much fewer random bits than drawing every document
+    cdf = _poisson_cdf(num_documents / (num_documents + 3 * np.sqrt(num_documents)))
+    weights = _poisson_counts(rng, cdf, num_resamples * num_documents, dtype).reshape(num_resamples, num_documents)
+    deficits = num_documents - weights.sum(axis=1, dtype=np.int64)
+    redraw = np.flatnonzero(deficits < 0)
+    while len(redraw):
+        weights[redraw] = _poisson_counts(rng, cdf, len(redraw) * num_documents, dtype).reshape(-1, num_documents)
+        deficits[redraw] = num_documents - weights[redraw].sum(axis=1, dtype=np.int64)
+        redraw = redraw[deficits[redraw] < 0]
+    draws = rng.randint(0, num_documents, size=int(deficits.sum()), dtype=np.int64)
+    draws += np.repeat(np.arange(num_resamples, dtype=np.int64) * num_documents, deficits)
+    cells, counts = np.unique(draws, return_counts=True)
+    weights.ravel()[cells] += counts.astype(dtype)
+    return weights
+
+
+def _poisson_cdf(mean):
+    """
+    CDF of the Poisson distribution with given mean up to the count where it reaches 1 (in double precision).
+    """
+    pmf, cdf = np.exp(-mean), [np.exp(-mean)]
+    while cdf[-1] < 1 and pmf > 0:
+        pmf *= mean / len(cdf)
+        cdf.append(cdf[-1] + pmf)
+    cdf[-1] = 1
+    return np.array(cdf)
+
+
+def _poisson_counts(rng, cdf, size, dtype):
+    """
+    Array of size counts with given CDF. One random byte decides the count unless its 1/256 interval contains a step
+    of the CDF, then four more bytes refine it.
+    """
+    first = rng.bytes(size)
+    lows = np.searchsorted(cdf, np.arange(256) / 256, side='right')
+    highs = np.searchsorted(cdf, np.arange(1, 257) / 256, side='left')
+    table = np.where(lows == highs, lows, UNDECIDED).astype(np.uint8)
+    # translating the bytes is much faster than indexing the table with them
+    counts = np.frombuffer(first.translate(table.tobytes()), dtype=np.uint8)
+    refine = np.flatnonzero(counts == UNDECIDED)
+    counts = counts.astype(dtype)
+    fractions = np.frombuffer(rng.bytes(4 * len(refine)), dtype=np.uint32) / 2 ** 32
+    first = np.frombuffer(first, dtype=np.uint8)[refine]
+    counts[refine] = np.searchsorted(cdf, (first + fractions) / 256, side='right')
+    return counts
+
+
+def _percentile_interval(stats, level):
+    """
+    Percentile interval of given level along the first axis, ignoring resamples for which a statistic is undefined.
+    """
+    alpha = (1 - level) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all resamples undefined -> NaN
+        low, high = np.nanpercentile(stats, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return Interval(low, high)
+
+
+def compute_f1_agreement(project_root, input_gen=input_generator, token_func=None, eval_func=None, index=None,
+                         workers=1, backend=None, cache=None, annotation_filter=None, document_sink=None):
+    """
+    Computes F1 agreement for the given project, optionally reusing a ProjectIndex (index) and a ParseCache or cache
+    directory (cache) across calls.
+    """
     if not eval_func:
         eval_func = exact_match_instance_evaluation
         if token_func:
             eval_func = exact_match_token_evaluation
 
+    input_gen, labels, annotators, documents, cache, annotation_filter = _setup_project(
+        project_root, input_gen, index, cache, annotation_filter)
+    return F1Agreement(input_gen, labels, eval_func=eval_func, token_func=token_func,
+                       annotators=annotators,
+                       documents=documents,
+                       workers=workers,
+                       backend=backend,
+                       cache=cache,
+                       annotation_filter=annotation_filter,
+                       document_sink=document_sink)
+
+
+def compute_f1_agreements(project_root, metrics, input_gen=input_generator, index=None, workers=1, backend=None,
+                          cache=None, annotation_filter=None):
+    """
+    Computes several F1 agreements for the given project in a single pass over its files. metrics maps names to an
+    eval_func or an (eval_func, token_func) tuple, the result maps them to F1Agreement objects.
+    """
+    input_gen, labels, annotators, documents, cache, annotation_filter = _setup_project(
+        project_root, input_gen, index, cache, annotation_filter)
+    agreements = {}
+    for name, metric in metrics.items():
+        eval_func, token_func = metric if isinstance(metric, tuple) else (metric, None)
+        agreements[name] = F1Agreement(input_gen, labels, eval_func=eval_func, token_func=token_func,
+                                       annotators=annotators, documents=documents, workers=workers, backend=backend,
+                                       cache=cache, annotation_filter=annotation_filter, count=False)
+    if not agreements:
+        return agreements
+    counter = MultiDocumentCounter([agreement._document_counter() for agreement in agreements.values()])
+    first = next(iter(agreements.values()))
+    for doc_index, (doc_id, blocks, messages) in enumerate(first._count_documents(counter, input_gen())):
+        assert doc_index < len(documents), 'Input generator yields more documents than expected!'
+        for agreement, block in zip(agreements.values(), blocks):
+            agreement._add_document(doc_id, block, messages)
+    return agreements
+
+
+def _setup_project(project_root, input_gen, index, cache, annotation_filter=None):
+    """
+    Returns input generator, labels, annotators and documents of given project, the ParseCache to use (if any) and
+    the compiled annotation filter (if any).
+    """
+    if cache is not None and not isinstance(cache, ParseCache):
+        cache = ParseCache(cache, project_root)
     config = ProjectConfiguration(project_root)
     labels = config.get_entity_types()
-    input_gen = partial(input_gen, project_root)
+    if annotation_filter is not None:
+        annotation_filter = annotation_filter.compile(config)
+    if index is None and input_gen is input_generator:
+        index = ProjectIndex(project_root)
+    input_gen = index if index is not None else partial(input_gen, project_root)
     annotators, documents = _collect_annotators_and_documents(input_gen)
-
-    return F1Agreement(input_gen, sorted(labels), eval_func=eval_func, token_func=token_func,
-                       annotators=sorted(annotators),
-                       documents=sorted(documents))
+    return input_gen, sorted(labels), sorted(annotators), sorted(documents), cache, annotation_filter
 
 
 def iaa_report(f1_agreement, precision=3):
@@ -307,9 +774,10 @@ def iaa_report(f1_agreement, precision=3):
     print(f'* {len(f1_agreement.documents)} agreement documents')
     print(f'* {len(f1_agreement.labels)} labels')
 
-    print('\n## Agreement per Document\n')
-    f1_agreement.print_table('Document', f1_agreement.documents, *f1_agreement.mean_sd_per_document(),
-                             precision=precision)
+    if f1_agreement.has_document_counts:
+        print('\n## Agreement per Document\n')
+        f1_agreement.print_table('Document', f1_agreement.documents, *f1_agreement.mean_sd_per_document(),
+                                 precision=precision)
 
     print('\n## Agreement per Label\n')
     f1_agreement.print_table('Label', f1_agreement.labels, *f1_agreement.mean_sd_per_label(), precision=precision)
@@ -317,3 +785,10 @@ def iaa_report(f1_agreement, precision=3):
     print('\n## Overall Agreement\n')
     avg, stddev = f1_agreement.mean_sd_total()
     print(f'* Mean F1: {avg:.{precision}f}, SD F1: {stddev:.{precision}f}\n')
+
+    if f1_agreement.messages:
+        print('## Messages\n')
+        for doc_id, messages in f1_agreement.messages.items():
+            for message in messages:
+                print(f'* {doc_id} ({message.type}): {message.text}')
+        print()
@@ -1,9 +1,17 @@
+import json
 import logging
+import sys
+from contextlib import ExitStack
 
 import argparse
 
-from bratiaa.agree import iaa_report, compute_f1_agreement
+from bratiaa.agree import iaa_report, compute_f1_agreement, ProjectIndex
+from bratiaa.export import export_counts
+from bratiaa.messages import set_message_sink
+from bratiaa.profiling import profiling, TOP_DOCUMENTS
+from bratiaa.streaming import open_document_sink
 from bratiaa.utils import tokenize
+from bratiaa.watch import watch_project
 
 
 def parse_args():
@@ -13,6 +21,10 @@ def parse_args():
     parser.add_argument('--heatmap',
                         help='Output path for F1-agreement heatmap',
                         dest='heatmap_path')
+    parser.add_argument('--raw-heatmap',
+                        help='Write heatmap as plain PNG image (one 4x4 pixel block per annotator pair), e.g. for '
+                             'very large numbers of annotators',
+                        action='store_true')
     parser.add_argument('-p', '--precision',
                         help='Precision of results (number of digits following the decimal point)',
                         dest='precision',
@@ -23,7 +35,51 @@ def parse_args():
     parser.add_argument('-t', '--tokenize',
                         help='Token-based evaluation (tokenizer splits on whitespace)',
                         action='store_true')
-    return parser.parse_args()
+    parser.add_argument('-j', '--jobs',
+                        help='Number of processes computing agreement in parallel',
+                        dest='jobs',
+                        type=int,
+                        default=1)
+    parser.add_argument('--cache-dir',
+                        help='Directory for caching parsed annotations and tokenized texts across runs',
+                        dest='cache_dir')
+    parser.add_argument('-w', '--watch',
+                        help='Keep watching the project and report again whenever annotations change',
+                        action='store_true')
+    parser.add_argument('--interval',
+                        help='Polling interval in seconds for --watch',
+                        type=float,
+                        default=1.0)
+    parser.add_argument('--debounce',
+                        help='Seconds without further changes before re-reporting in --watch mode',
+                        type=float,
+                        default=2.0)
+    parser.add_argument('--profile',
+                        help='Write stage timings, counts of parsed files and annotations and the slowest documents '
+                             'of the agreement computation as JSON to given path (default: stderr)',
+                        nargs='?',
+                        const='-',
+                        metavar='PATH')
+    parser.add_argument('--profile-top',
+                        help='Number of slowest documents listed by --profile',
+                        type=int,
+                        default=TOP_DOCUMENTS)
+    parser.add_argument('--per-document',
+                        help='Stream per-document agreement to given CSV or JSONL file while documents are processed '
+                             'instead of keeping per-document counts (omits the per-document table of the report)',
+                        dest='per_document_path',
+                        metavar='PATH')
+    parser.add_argument('--export-counts',
+                        help='Write the raw counts (annotator pair, document, label, tp, total) to given NPZ or '
+                             'Parquet file (Parquet requires pyarrow)',
+                        dest='counts_path',
+                        metavar='PATH')
+    args = parser.parse_args()
+    if args.per_document_path and args.watch:
+        parser.error('--per-document cannot be combined with --watch')
+    if args.per_document_path and args.counts_path:
+        parser.error('--per-document does not keep per-document counts, so cannot be combined with --export-counts')
+    return args
 
 
 def main():
@@ -33,15 +89,69 @@ def main():
         log_level = logging.ERROR
     logging.basicConfig(level=log_level,
                         format='%(asctime)s - %(levelname)s - %(message)s')
+    # messages about single documents are part of the report, all others are logged
+    set_message_sink('logging')
 
     token_func = None
     if args.tokenize:
         token_func = tokenize
 
-    f1_agreement = compute_f1_agreement(args.project_root, token_func=token_func)
+    streaming, profile = {}, None
+    # the document sink is closed (and flushed) even if counting fails
+    with ExitStack() as stack:
+        if args.per_document_path:
+            streaming = {'backend': 'aggregate',
+                         'document_sink': stack.enter_context(open_document_sink(args.per_document_path))}
+        if args.profile:
+            profile = stack.enter_context(profiling(args.profile_top))
+        index = ProjectIndex(args.project_root)
+        f1_agreement = compute_f1_agreement(args.project_root, token_func=token_func, workers=args.jobs,
+                                            cache=args.cache_dir, index=index, **streaming)
+    report(f1_agreement, args)
+    if profile is not None:
+        write_profile(profile, args.profile)
+    if args.watch:
+        try:
+            for index, changes in watch_project(index, interval=args.interval, debounce=args.debounce):
+                if changes is None:
+                    # annotators or documents were added or removed
+                    f1_agreement = compute_f1_agreement(args.project_root, token_func=token_func, workers=args.jobs,
+                                                        cache=args.cache_dir, index=index)
+                else:
+                    update(f1_agreement, changes)
+                report(f1_agreement, args)
+        except KeyboardInterrupt:
+            pass
+
+
+def update(f1_agreement, changes):
+    """
+    Updates agreement with changes of ProjectIndex.changed_documents, batching documents with the same annotators.
+    """
+    by_annotators = {}
+    for doc_id, annotators in changes.items():
+        by_annotators.setdefault(frozenset(annotators), []).append(doc_id)
+    for annotators, doc_ids in by_annotators.items():
+        logging.info(f'Updating {len(doc_ids)} document(s) changed by {", ".join(sorted(annotators))}')
+        f1_agreement.update(doc_ids, annotators=annotators)
+
+
+def write_profile(profile, path):
+    if path == '-':
+        json.dump(profile.summary(), sys.stderr, indent=2)
+        sys.stderr.write('\n')
+    else:
+        with open(path, 'w', encoding='utf-8') as fout:
+            json.dump(profile.summary(), fout, indent=2)
+
+
+def report(f1_agreement, args):
     iaa_report(f1_agreement, args.precision)
+    if args.counts_path:
+        export_counts(f1_agreement, args.counts_path)
     if args.heatmap_path:
-        f1_agreement.draw_heatmap(args.heatmap_path)
+        f1_agreement.draw_heatmap(args.heatmap_path, raw=args.raw_heatmap)
+    sys.stdout.flush()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,192 @@
+"""
+Persistent on-disk cache for parsed ANN files and tokenized texts.
+"""
+import hashlib
+import logging
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from bratiaa.messages import collect_messages, replay_messages
+from bratiaa.parser import parse_ann_file
+from bratiaa.utils import read
+from bratsubset.projectconfig import get_config_path
+
+# default upper bound for the total size of all cache entries
+MAX_CACHE_BYTES = 2 ** 30
+
+# after exceeding the size bound, least recently used entries are evicted until this fraction of it is reached
+EVICTION_TARGET = 0.9
+
+ENTRY_SUFFIX = '.pickle'
+
+# part of every key, increased when the content of entries changes so older entries are not read
+ENTRY_VERSION = 2
+
+
+class ParseCache:
+    """
+    Caches the parsed annotations of ANN files and the tokenization of TXT files in the given directory.
+
+    Entries are keyed by the file's absolute path and the digest of the project's annotation.conf, tokenizations also
+    by tokenizer (name, code hash and optional cache_version attribute). An entry is valid while the file's size and
+    mtime (or its content hash) are unchanged. Least recently used entries are evicted beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir, project_root=None, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._config_path = _config_path(project_root)
+        self._config_stat = None
+        self._config_digest = ''
+        self.hits, self.misses = 0, 0
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    @property
+    def config_digest(self):
+        """
+        Digest of the project's annotation.conf (empty without one), recomputed when its size or mtime changed.
+        """
+        if self._config_path is None:
+            return ''
+        try:
+            stat = os.stat(self._config_path)
+        except (FileNotFoundError, TypeError):  # no annotation.conf in the directory tree
+            self._config_stat, self._config_digest = None, ''
+            return ''
+        if (stat.st_size, stat.st_mtime_ns) != self._config_stat:
+            self._config_stat = (stat.st_size, stat.st_mtime_ns)
+            self._config_digest = _file_digest(self._config_path).hex()
+        return self._config_digest
+
+    def parse_ann_file(self, ann_path, annotation_filter=None):
+        """
+        Cached bratiaa.parser.parse_ann_file. Results of different filters are cached separately.
+        """
+        kind = 'ann' if annotation_filter is None else 'ann ' + annotation_filter.key
+        return self._get(ann_path, kind, lambda path: parse_ann_file(path, annotation_filter))
+
+    def tokenize(self, txt_path, token_func):
+        """
+        Returns text and cached list of (start, end) tokens of given TXT file. Tokenizers without a stable name
+        (lambdas, nested functions) are not cached.
+        """
+        text = read(txt_path)
+        name = _tokenizer_key(token_func)
+        if name is None:
+            return text, list(token_func(text))
+        # stored as (n, 2) array, which is much more compact than a pickled list of tuples
+        tokens = self._get(txt_path, 'tokens ' + name, lambda _: np.array(list(token_func(text)), dtype=np.int64))
+        return text, list(map(tuple, tokens.reshape(-1, 2).tolist()))
+
+    def _get(self, path, kind, compute):
+        stat = os.stat(path)
+        key = f'{ENTRY_VERSION}\0{kind}\0{os.path.abspath(path)}\0{self.config_digest}'
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        entry_path = self.cache_dir / key[:2] / (key + ENTRY_SUFFIX)
+        entry = self._load(entry_path)
+        if entry and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            self.hits += 1
+            os.utime(entry_path)  # mark as recently used
+            replay_messages(entry['messages'])
+            return entry['value']
+        digest = _file_digest(path)
+        if entry and entry['digest'] == digest:
+            value, messages = entry['value'], entry['messages']
+            self.hits += 1
+        else:
+            # messages (e.g. about malformed lines) are stored with the value, so hits report them as well
+            with collect_messages(maxlen=None) as messages:
+                value = compute(path)
+            self.misses += 1
+        replay_messages(messages)
+        self._store(entry_path, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest,
+                                 'value': value, 'messages': messages})
+        return value
+
+    @staticmethod
+    def _load(entry_path):
+        try:
+            with open(entry_path, 'rb') as fin:
+                return pickle.load(fin)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logging.warning(f'Ignoring corrupt cache entry {entry_path}: {e}')
+            return None
+
+    def _store(self, entry_path, entry):
+        entry_path.parent.mkdir(exist_ok=True)
+        old_size = entry_path.stat().st_size if entry_path.exists() else 0
+        # write to temporary file first, so concurrent readers never see partial entries
+        tmp_path = entry_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(entry, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        self._size += entry_path.stat().st_size - old_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for subdir in os.scandir(self.cache_dir):
+            if subdir.is_dir():
+                yield from (entry for entry in os.scandir(subdir.path) if entry.name.endswith(ENTRY_SUFFIX))
+
+    def evict(self, target_bytes=None):
+        """
+        Removes least recently used entries until the cache is smaller than target_bytes (default: a fraction of
+        max_bytes).
+        """
+        if target_bytes is None:
+            target_bytes = self.max_bytes * EVICTION_TARGET
+        entries = sorted(((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in self._entries()))
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def clear(self):
+        self.evict(target_bytes=0)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as fin:
+        return hashlib.blake2b(fin.read(), digest_size=16).digest()
+
+
+def _config_path(project_root):
+    if project_root is None:
+        return None
+    return get_config_path(os.path.abspath(project_root))
+
+
+def _tokenizer_key(token_func):
+    """
+    Name, code hash and cache_version of given tokenizer or None if it has no stable name (lambdas, nested functions).
+    """
+    name = f'{getattr(token_func, "__module__", None)}.{getattr(token_func, "__qualname__", "<unknown>")}'
+    if '<' in name:
+        return None
+    code = getattr(token_func, '__code__', None)
+    if code is not None:
+        digest = hashlib.blake2b(digest_size=8)
+        _hash_code(digest, code)
+        name += ' ' + digest.hexdigest()
+    return f'{name} {getattr(token_func, "cache_version", "")}'
+
+
+def _hash_code(digest, code):
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _hash_code(digest, const)  # the repr of nested code objects contains their memory address
+        else:
+            digest.update(repr(const).encode('utf-8'))
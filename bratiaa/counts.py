@@ -0,0 +1,290 @@
+"""
+Storage backends for the (pair, document, count, label) tensor of true positives and totals.
+"""
+import numpy as np
+
+# dense storage is used as long as the tensor fits into this many bytes (with the widest dense dtype)
+MAX_DENSE_BYTES = 2 ** 30
+
+# widest dtype a dense tensor is widened to
+MAX_DENSE_DTYPE = np.uint32
+
+# number of documents reduced at once when computing per-document statistics
+DOCUMENT_CHUNK_SIZE = 4096
+
+UNSIGNED_DTYPES = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+
+def fit_dtype(max_value):
+    """
+    Smallest unsigned integer dtype that can hold the given value.
+    """
+    for dtype in UNSIGNED_DTYPES:
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    raise OverflowError(f'Count {max_value} exceeds 64 bit!')
+
+
+def create_counts(num_pairs, num_documents, num_labels, backend=None):
+    """
+    Creates an empty count store. Unless a backend ('dense', 'sparse' or 'aggregate') is requested, the sparse backend
+    is chosen if the dense tensor would exceed MAX_DENSE_BYTES.
+    """
+    shape = (num_pairs, num_documents, 2, num_labels)
+    if backend is None:
+        max_dense_bytes = np.prod(shape, dtype=np.float64) * np.dtype(MAX_DENSE_DTYPE).itemsize
+        backend = 'sparse' if max_dense_bytes > MAX_DENSE_BYTES else 'dense'
+    if backend == 'dense':
+        return DenseCounts(shape)
+    if backend == 'sparse':
+        return SparseCounts(shape)
+    if backend == 'aggregate':
+        return AggregateCounts(shape)
+    raise ValueError(f'Unknown count backend "{backend}"!')
+
+
+class DenseCounts:
+    """
+    Dense (p, d, c, l) tensor with the smallest unsigned integer dtype fitting the counts seen so far (at most
+    MAX_DENSE_DTYPE).
+    """
+    per_document = True
+
+    def __init__(self, shape):
+        self.shape = shape
+        self._pdcl = np.zeros(shape, dtype=np.uint8)
+        self._pcl = np.zeros(shape[:1] + shape[2:], dtype=np.int64)  # running sum over documents
+
+    def add(self, doc, block):
+        """
+        Adds (p, c, l) counts block to given document.
+        """
+        self._reserve(int(self._pdcl[:, doc].max(initial=0)) + int(block.max(initial=0)))
+        self._pdcl[:, doc] += block.astype(self._pdcl.dtype)
+        self._pcl += block
+
+    def set(self, doc, block):
+        """
+        Replaces the (p, c, l) counts of given document.
+        """
+        self._reserve(int(block.max(initial=0)))
+        self._pcl += block - self.document(doc)
+        self._pdcl[:, doc] = block
+
+    def cells(self):
+        """
+        Non-zero cells as arrays (pairs, documents, counts, labels, values).
+        """
+        p, d, c, l = np.nonzero(self._pdcl)
+        return p, d, c, l, self._pdcl[p, d, c, l]
+
+    def add_cells(self, pairs, documents, counts, labels, values):
+        """
+        Adds values to given cells at once (e.g. when loading exported counts).
+        """
+        values = np.asarray(values, dtype=np.int64)
+        # sum values of repeated cells, then update each cell once
+        keys, inverse = np.unique(np.ravel_multi_index((pairs, documents, counts, labels), self.shape),
+                                  return_inverse=True)
+        merged = self._pdcl.ravel()[keys] + np.bincount(inverse.ravel(), values, len(keys)).astype(np.int64)
+        self._reserve(int(merged.max(initial=0)))
+        self._pdcl.ravel()[keys] = merged
+        np.add.at(self._pcl, (pairs, counts, labels), values)
+
+    def _reserve(self, max_value):
+        dtype = fit_dtype(max_value)
+        if np.iinfo(dtype).max > np.iinfo(MAX_DENSE_DTYPE).max:
+            raise OverflowError(f'Count {max_value} exceeds the dense count backend, use the sparse one!')
+        if np.iinfo(dtype).max > np.iinfo(self._pdcl.dtype).max:
+            self._pdcl = self._pdcl.astype(dtype)
+
+    def document(self, doc):
+        """
+        (p, c, l) counts of given document.
+        """
+        return self._pdcl[:, doc].astype(np.int64)
+
+    def sum_documents(self):
+        """
+        (p, c, l) counts summed over all documents.
+        """
+        return self._pcl.copy()
+
+    def sum_labels(self, start, stop):
+        """
+        (p, d, c) counts of documents [start, stop) summed over labels.
+        """
+        return np.sum(self._pdcl[:, start:stop], axis=3, dtype=np.int64)
+
+    def toarray(self):
+        return self._pdcl.astype(np.int64)
+
+    def document_matrix(self):
+        """
+        (d, p * c * l) matrix with the counts of one document per row.
+        """
+        num_pairs, num_documents, num_counts, num_labels = self.shape
+        return self._pdcl.transpose(1, 0, 2, 3).reshape(num_documents, num_pairs * num_counts * num_labels)
+
+    @property
+    def nbytes(self):
+        return self._pdcl.nbytes
+
+
+class SparseCounts:
+    """
+    Sparse storage with one CSR row per document and one column per (pair, count, label) cell. Cells that are zero
+    for a document (e.g. labels not used in it) take no memory.
+    """
+    per_document = True
+
+    def __init__(self, shape):
+        self.shape = shape
+        num_pairs, num_documents, num_counts, num_labels = shape
+        self._num_cols = num_pairs * num_counts * num_labels
+        self._index_dtype = np.int32 if self._num_cols <= np.iinfo(np.int32).max else np.int64
+        self._rows = {}  # document -> (column indices, values)
+        self._matrix = None  # CSR matrix assembled from rows on demand
+        self._pcl = np.zeros(shape[:1] + shape[2:], dtype=np.int64)  # running sum over documents
+
+    def add(self, doc, block):
+        self.set(doc, self.document(doc) + block)
+
+    def set(self, doc, block):
+        self._pcl += block - self.document(doc)
+        cols = np.flatnonzero(block)
+        values = block.ravel()[cols]
+        if len(cols):
+            self._rows[doc] = (cols.astype(self._index_dtype), values.astype(fit_dtype(int(values.max()))))
+        else:
+            self._rows.pop(doc, None)
+        self._matrix = None
+
+    def cells(self):
+        num_pairs, _, num_counts, num_labels = self.shape
+        docs = sorted(self._rows)
+        cols = np.concatenate([self._rows[d][0] for d in docs] or [np.zeros(0, dtype=self._index_dtype)])
+        values = np.concatenate([self._rows[d][1].astype(np.int64) for d in docs] or [np.zeros(0, dtype=np.int64)])
+        documents = np.repeat(np.array(docs, dtype=np.int64), [len(self._rows[d][0]) for d in docs])
+        p, c, l = np.unravel_index(cols, (num_pairs, num_counts, num_labels))
+        return p, documents, c, l, values
+
+    def add_cells(self, pairs, documents, counts, labels, values):
+        num_pairs, _, num_counts, num_labels = self.shape
+        cols = np.ravel_multi_index((pairs, counts, labels), (num_pairs, num_counts, num_labels))
+        # sum values of repeated cells, sorted by document and column
+        keys, inverse = np.unique(np.asarray(documents, dtype=np.int64) * self._num_cols + cols, return_inverse=True)
+        sums = np.bincount(inverse.ravel(), np.asarray(values, dtype=np.int64), len(keys)).astype(np.int64)
+        nonzero = sums != 0
+        docs, cols = np.divmod(keys[nonzero], self._num_cols)
+        sums = sums[nonzero]
+        if not len(docs):
+            return
+        boundaries = np.flatnonzero(docs[1:] != docs[:-1]) + 1
+        fresh = np.zeros(len(docs), dtype=bool)  # cells of documents without counts so far
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(docs)]):
+            doc = int(docs[start])
+            if doc in self._rows:
+                block = np.zeros(self._num_cols, dtype=np.int64)
+                block[cols[start:stop]] = sums[start:stop]
+                self.add(doc, block.reshape(self._pcl.shape))
+            else:
+                doc_sums = sums[start:stop]
+                self._rows[doc] = (cols[start:stop].astype(self._index_dtype),
+                                   doc_sums.astype(fit_dtype(int(doc_sums.max()))))
+                fresh[start:stop] = True
+        np.add.at(self._pcl.reshape(-1), cols[fresh], sums[fresh])
+        self._matrix = None
+
+    def _csr(self):
+        if self._matrix is None:
+            from scipy.sparse import csr_matrix
+            num_documents = self.shape[1]
+            lengths = np.zeros(num_documents + 1, dtype=np.int64)
+            for doc, (cols, _) in self._rows.items():
+                lengths[doc + 1] = len(cols)
+            docs = sorted(self._rows)
+            indices = np.concatenate([self._rows[d][0] for d in docs] or [np.zeros(0, dtype=self._index_dtype)])
+            values = np.concatenate([self._rows[d][1] for d in docs] or [np.zeros(0, dtype=np.uint8)])
+            self._matrix = csr_matrix((values, indices, np.cumsum(lengths)),
+                                      shape=(num_documents, self._num_cols))
+        return self._matrix
+
+    def document(self, doc):
+        cl_shape = self.shape[:1] + self.shape[2:]
+        block = np.zeros(self._num_cols, dtype=np.int64)
+        if doc in self._rows:
+            cols, values = self._rows[doc]
+            block[cols] = values
+        return block.reshape(cl_shape)
+
+    def sum_documents(self):
+        return self._pcl.copy()
+
+    def sum_labels(self, start, stop):
+        from scipy.sparse import csr_matrix
+        num_pairs, _, num_counts, num_labels = self.shape
+        # maps each (p, c, l) column to its (p, c) column
+        to_pc = csr_matrix((np.ones(self._num_cols, dtype=np.int64), np.arange(self._num_cols) // num_labels,
+                            np.arange(self._num_cols + 1)), shape=(self._num_cols, num_pairs * num_counts))
+        dpc = (self._csr()[start:stop].astype(np.int64) @ to_pc).toarray()
+        return dpc.reshape(stop - start, num_pairs, num_counts).transpose(1, 0, 2)
+
+    def document_matrix(self):
+        return self._csr()
+
+    def toarray(self):
+        dense = self._csr().toarray().astype(np.int64)
+        num_pairs, num_documents, num_counts, num_labels = self.shape
+        return dense.reshape(num_documents, num_pairs, num_counts, num_labels).transpose(1, 0, 2, 3)
+
+    @property
+    def nbytes(self):
+        return sum(cols.nbytes + values.nbytes for cols, values in self._rows.values())
+
+
+class AggregateCounts:
+    """
+    Keeps only the (p, c, l) counts summed over documents. Per-document counts are not available (use a document
+    sink to stream per-document agreement instead).
+    """
+    per_document = False
+
+    def __init__(self, shape):
+        self.shape = shape
+        self._pcl = np.zeros(shape[:1] + shape[2:], dtype=np.int64)
+
+    def add(self, doc, block):
+        self._pcl += block
+
+    def set(self, doc, block):
+        self._per_document()
+
+    def cells(self):
+        self._per_document()
+
+    def add_cells(self, pairs, documents, counts, labels, values):
+        np.add.at(self._pcl, (pairs, counts, labels), np.asarray(values, dtype=np.int64))
+
+    def document(self, doc):
+        self._per_document()
+
+    def sum_documents(self):
+        return self._pcl.copy()
+
+    def sum_labels(self, start, stop):
+        self._per_document()
+
+    def toarray(self):
+        self._per_document()
+
+    def document_matrix(self):
+        self._per_document()
+
+    @staticmethod
+    def _per_document():
+        raise ValueError('Per-document counts are not kept by the aggregate count backend!')
+
+    @property
+    def nbytes(self):
+        return self._pcl.nbytes
@@ -5,7 +5,11 @@ Functions for computing the difference between two sets of annotations.
 from collections import namedtuple, Counter
 import sys
 
-import bratsubset.annotation as bs
+import numpy as np
+
+from bratiaa.filters import DEFAULT_FILTER
+from bratiaa.parser import parse_ann_file, ParsedAnnotations
+from bratsubset.annotation import AnnotationNotFoundError
 
 AspAnnotation = namedtuple('AspAnnotation', ['type','label', 'offsets'])
 
@@ -19,155 +23,317 @@ RelAnnotation = namedtuple('RelAnnotation', ['type', 'label', 'source_id', 'targ
 
 FinalRelAnnotation = namedtuple('FinalRelAnnotation', ['type', 'label', 'source', 'target'])
 
+# annotation multiset encoded as sorted unique integer keys with the label id and multiplicity of each key
+EncodedAnnotations = namedtuple('EncodedAnnotations', ['keys', 'labels', 'counts'])
+
+
+class TargetNotFoundError(AnnotationNotFoundError):
+    """
+    A relation or attribute references a text-bound annotation that does not exist.
+    """
+
+    def __init__(self, id, referenced_by, ann_path=None):
+        super().__init__(id)
+        self.referenced_by = referenced_by
+        self.ann_path = ann_path
+
+    def __str__(self):
+        location = f' in {self.ann_path}' if self.ann_path else ''
+        return f'Could not find text-bound annotation {self.id} referenced by {self.referenced_by}{location}'
+
+
+def evaluation_phases(read, compare, read_counts=None, compare_counts=None):
+    """
+    Attaches a two-phase implementation to a path-based evaluation function: read(ann_path, tokens) parses a single
+    ANN file into an annotation multiset, compare(exp, pred) returns true positives, expected and predicted
+    annotations for two such multisets. Each file only has to be parsed once per document this way.
+
+    Optionally, a counts-only mode can be attached as well: read_counts(ann_path, tokens, label_ids, vocabulary)
+    encodes a single ANN file as EncodedAnnotations (label_ids maps a list of labels to their ids, vocabulary is a
+    dict shared by all files of a document), compare_counts(exp, pred, num_labels) returns per-label vectors of true
+    positives, expected and predicted annotations without materializing any annotation.
+    """
+
+    def decorator(eval_func):
+        eval_func.read = read
+        eval_func.compare = compare
+        if read_counts and compare_counts:
+            eval_func.read_counts = read_counts
+            eval_func.compare_counts = compare_counts
+        return eval_func
+
+    return decorator
+
+
+def two_phase(eval_func):
+    """
+    Returns (read, compare) for the given evaluation function. Plain path-based evaluation functions are adapted by
+    deferring all work to the comparison phase.
+    """
+    try:
+        return eval_func.read, eval_func.compare
+    except AttributeError:
+        return _PathReader(), _PathComparison(eval_func)
+
+
+def counts_only(eval_func):
+    """
+    Returns (read_counts, compare_counts) for the given evaluation function or None if it has no counts-only mode.
+    """
+    try:
+        return eval_func.read_counts, eval_func.compare_counts
+    except AttributeError:
+        return None
+
+
+class _PathReader:
+    def __call__(self, ann_path, tokens=None):
+        return ann_path, tokens
+
+
+class _PathComparison:
+    def __init__(self, eval_func):
+        self.eval_func = eval_func
+
+    def __call__(self, exp, pred):
+        (ann_path_1, tokens), (ann_path_2, _) = exp, pred
+        return self.eval_func(ann_path_1, ann_path_2, tokens=tokens)
+
+
+_default_filter = DEFAULT_FILTER.compile()
+
+
+def _parsed(ann):
+    # read phases accept ANN file paths as well as annotations parsed (and filtered) in advance, e.g. by the
+    # DocumentCounter or loaded from a cache
+    return ann if isinstance(ann, ParsedAnnotations) else parse_ann_file(ann)
+
+
+def _compare_sets(exp, pred):
+    return exp.keys() & pred.keys(), list(exp.elements()), list(pred.elements())
+
+
+def _compare_multisets(exp, pred):
+    return list((exp & pred).elements()), list(exp.elements()), list(pred.elements())
+
+
+class _EncodedReader:
+    """
+    Counts-only read phase for annotation multisets of hashable annotations with a label, which are numbered through
+    the vocabulary shared by all files of a document.
+    """
+
+    def __init__(self, read):
+        self.read = read
+
+    def __call__(self, ann_path, tokens, label_ids, vocabulary):
+        annotations = self.read(ann_path, tokens)
+        keys = np.fromiter((vocabulary.setdefault(a, len(vocabulary)) for a in annotations), dtype=np.int64,
+                           count=len(annotations))
+        counts = np.fromiter(annotations.values(), dtype=np.int64, count=len(annotations))
+        labels = _encode_labels([a.label for a in annotations], label_ids)
+        order = np.argsort(keys)
+        return EncodedAnnotations(keys[order], labels[order], counts[order])
+
+
+def _encode_labels(labels, label_ids):
+    # look up each distinct label only once
+    distinct, inverse = np.unique(np.array(labels, dtype=object), return_inverse=True)
+    return np.array(label_ids(distinct.tolist()), dtype=np.int64).reshape(-1)[inverse.reshape(-1)]
+
+
+class _CountsComparison:
+    """
+    Counts-only comparison of two EncodedAnnotations by intersecting their sorted keys. Common keys are counted once
+    as true positive for sets and with the smaller multiplicity for multisets.
+    """
+
+    def __init__(self, multiset):
+        self.multiset = multiset
+
+    def __call__(self, exp, pred, num_labels):
+        _, exp_common, pred_common = np.intersect1d(exp.keys, pred.keys, assume_unique=True, return_indices=True)
+        if self.multiset:
+            common = np.minimum(exp.counts[exp_common], pred.counts[pred_common])
+        else:
+            common = np.ones(len(exp_common), dtype=np.int64)
+        return (_label_counts(exp.labels[exp_common], common, num_labels),
+                _label_counts(exp.labels, exp.counts, num_labels),
+                _label_counts(pred.labels, pred.counts, num_labels))
+
+
+def _label_counts(labels, counts, num_labels):
+    label_counts = np.zeros(num_labels, dtype=np.int64)
+    np.add.at(label_counts, labels, counts)
+    return label_counts
+
+
+def _read_instances(ann_path, tokens=None):
+    return Counter(_read_textbound_annotations(ann_path))
+
+
+def _compare_instances(exp, pred):
+    # unique annotation instances are true positives, duplicates still count as expected/predicted
+    return _compare_sets(exp, pred)
+
+
+@evaluation_phases(_read_instances, _compare_instances, _EncodedReader(_read_instances), _CountsComparison(False))
 def exact_match_instance_evaluation(ann_path_1, ann_path_2, tokens=None):
-    exp = list(_read_textbound_annotations(ann_path_1))
-    exp_set = set(exp)
-#     print("List = ", exp)
-#     print("Set = ", exp_set)
-#     print("------")
-    pred = list(_read_textbound_annotations(ann_path_2))
-    pred_set = set(pred)
-#     print("List = ", pred)
-#     print("Set = ", pred_set)
-    tp = exp_set.intersection(pred_set)
-#     print("Tp = ",tp)
-#     print("*****************************************")
-    return tp, exp, pred
+    return _compare_instances(_read_instances(ann_path_1), _read_instances(ann_path_2))
 
 
 def _read_textbound_annotations(ann_path):
-    with bs.Annotations(ann_path.as_posix(), read_only=True) as annotations:
-        for annotation in annotations.get_textbounds():
-            # Annotation spans will make is unique even in a list
-            aspect_ann=AspAnnotation('T', annotation.type, tuple(annotation.spans))
-            # We don't want NUM to be calculated for now
-            if aspect_ann.label not in ['NUM']:
-                yield aspect_ann
+    for annotation in _parsed(ann_path).textbounds:
+        # Annotation spans will make is unique even in a list
+        # labels to leave out (e.g. NUM) are dropped here rather than while parsing, so that the parsed file can be
+        # shared with relation and polarity evaluation, which keep them
+        if _default_filter.keep_textbound(annotation.label):
+            yield AspAnnotation('T', annotation.label, annotation.spans)
             
 '''
     Get polarity level tp
     Checks on (aspect category, polarity value)
 '''
-def exact_match_instance_polarity_evaluation(ann_path_1, ann_path_2, tokens=None):
-    exp = list(_read_attributebound_annotations(ann_path_1))
-    exp_set = set(exp)
-#     print("List = ", exp)
-#     print("Set = ", exp_set)
-#     print("------")
-    pred = list(_read_attributebound_annotations(ann_path_2))
-    pred_set = set(pred)
-#     print("List = ", pred)
-#     print("Set = ", pred_set)
-#     tp = exp_set.intersection(pred_set)
-    tp = list((Counter(exp) & Counter(pred)).elements())    
-#     print("Tp = ",tp)
-#     print("*****************************************")
-    return tp, exp, pred
-
-
-def _read_attributebound_annotations(ann_path):
-    with bs.Annotations(ann_path.as_posix(), read_only=True) as annotations:
-        polarity_ann = AttAnnotation
-        aspect_ann = Annotation
-        final_ann = FinalAnnotation
-        aspect_list = []
-        polarity_list = []
-        for annotation in annotations.get_textbounds():
-            aspect_ann=Annotation('T', annotation.id, annotation.type, tuple(annotation.spans))
-            if aspect_ann.label in ['GENERAL', 'PROFANITY', 'VIOLENCE', 'FEEDBACK']:
-                aspect_list.append(aspect_ann)
-
-        for annotation in annotations.get_attributes():
-            att_ann=AttAnnotation('A', annotation.id, annotation.target, annotation.value)
-            if att_ann.value in ['0', '1']:
-                polarity_list.append(att_ann)
-          
-        for each_aspect in aspect_list:
-            for each_polarity in polarity_list:
-                if each_aspect.id == each_polarity.target:
-                    final_ann = FinalAnnotation('T', each_aspect.label, each_polarity.value)
-                    yield final_ann
-                    
+# labels of aspects and attribute values considered by the default polarity evaluation
+ASPECT_LABELS = ('GENERAL', 'PROFANITY', 'VIOLENCE', 'FEEDBACK')
+
+POLARITY_VALUES = ('0', '1')
+
+
+def _read_polarities(ann_path, tokens=None, aspect_labels=ASPECT_LABELS, values=POLARITY_VALUES):
+    return Counter(_read_attributebound_annotations(ann_path, aspect_labels, values))
+
+
+class PolarityEvaluation:
+    """
+    Evaluates polarities as (aspect label, attribute value) pairs of all attributes with one of the given values
+    attached to aspects with one of the given labels (any label if aspect_labels is None).
+    """
+
+    def __init__(self, aspect_labels=ASPECT_LABELS, values=POLARITY_VALUES):
+        self.aspect_labels = None if aspect_labels is None else frozenset(aspect_labels)
+        self.values = frozenset(values)
+        evaluation_phases(self.read_polarities, _compare_multisets, _EncodedReader(self.read_polarities),
+                          _CountsComparison(True))(self)
+
+    def read_polarities(self, ann_path, tokens=None):
+        return _read_polarities(ann_path, tokens, self.aspect_labels, self.values)
+
+    def __call__(self, ann_path_1, ann_path_2, tokens=None):
+        return _compare_multisets(self.read_polarities(ann_path_1), self.read_polarities(ann_path_2))
+
+
+exact_match_instance_polarity_evaluation = PolarityEvaluation()
+
+
+def _read_attributebound_annotations(ann_path, aspect_labels=ASPECT_LABELS, values=POLARITY_VALUES):
+    annotations = _parsed(ann_path)
+    aspect_labels = None if aspect_labels is None else frozenset(aspect_labels)
+    values = frozenset(values)
+    # target id -> polarity values, grouped in a single pass over the attributes
+    polarities = {}
+    for annotation in annotations.attributes:
+        if annotation.value in values:
+            polarities.setdefault(annotation.target, []).append(annotation.value)
+
+    for annotation in annotations.textbounds:
+        if annotation.id in polarities and (aspect_labels is None or annotation.label in aspect_labels):
+            for value in polarities[annotation.id]:
+                yield FinalAnnotation('T', annotation.label, value)
+
 
 '''
     Get relation level tp
     Checks on (targeted/untargeted, aspect_category, target_entity)
 '''                    
-def exact_match_instance_relation_evaluation(ann_path_1, ann_path_2, tokens=None):
-    exp_list = list(_read_relationbound_annotations(ann_path_1))
-    exp_set = set(exp_list)
-#     print("List = ", exp_list)
-#     print("Set = ", exp_set)
-#     print("------")
-    pred_list = list(_read_relationbound_annotations(ann_path_2))
-    pred_set = set(pred_list)
-#     print("List = ", pred_list)
-#     print("Set = ", pred_set)
-#     tp = exp_set.intersection(pred_set)
-    tp = list((Counter(exp_list) & Counter(pred_list)).elements())
-#     print("Tp = ",tp)
-#     print("*****************************************")
-#     return (),(),()    
-#     return tp, exp_set, pred_set
-    # Using list instead of set because there might be
-    # duplicate tagging in a same sentence
-    # For example, there can be two GENERAL in same sentence
-    return tp, exp_list, pred_list
-
-
-def _read_relationbound_annotations(ann_path):
-    with bs.Annotations(ann_path.as_posix(), read_only=True) as annotations:
-        rel_ann = RelAnnotation
-        aspect_ann = Annotation
-        final_rel_ann = FinalRelAnnotation
-        polarity_ann = AttAnnotation
-        polarity_list = []        
-        aspect_list = []
-        relation_list = []
-        
-        for annotation in annotations.get_textbounds():
-            aspect_ann=Annotation('T', annotation.id, annotation.type, tuple(annotation.spans))
-            aspect_list.append(aspect_ann)
-                
-        # # Get untargeted aspect terms, with value 'YES'
-        for annotation in annotations.get_attributes():
-            att_ann=AttAnnotation('A', annotation.id, annotation.target, annotation.value)
-            if att_ann.value in ['YES']:
-                polarity_list.append(att_ann)
-            
-        for annotation in annotations.get_relations():
-            rel_ann=RelAnnotation('R', annotation.type, annotation.arg1, annotation.arg2)
-            relation_list.append(rel_ann)
-        
-        # Get targeted aspect terms
-        for each_rel in relation_list:
-            source_label = [x.label for x in aspect_list if x.id == each_rel.source_id]
-            target_label = [x.label for x in aspect_list if x.id == each_rel.target_id]
-            final_ann = FinalRelAnnotation('R', 'targeted', source_label[0], target_label[0])
-            yield final_ann
-
-        # Get untargeted aspect terms
-        for each_att in polarity_list:
-            source_label = [x.label for x in aspect_list if x.id == each_att.target]
-            target_label = ['NULL']
-            final_ann = FinalRelAnnotation('R', 'untargeted', source_label[0], target_label[0])
-            yield final_ann            
-                    
+# attribute values marking an aspect as untargeted
+UNTARGETED_VALUES = ('YES',)
+
+
+def _read_relations(ann_path, tokens=None, untargeted_values=UNTARGETED_VALUES):
+    return Counter(_read_relationbound_annotations(ann_path, untargeted_values))
+
+
+# Using multisets instead of sets because there might be
+# duplicate tagging in a same sentence
+# For example, there can be two GENERAL in same sentence
+class RelationEvaluation:
+    """
+    Evaluates relations as (targeted, source label, target label) and aspects carrying an attribute with one of the
+    given untargeted values as (untargeted, label, NULL).
+    """
+
+    def __init__(self, untargeted_values=UNTARGETED_VALUES):
+        self.untargeted_values = frozenset(untargeted_values)
+        evaluation_phases(self.read_relations, _compare_multisets, _EncodedReader(self.read_relations),
+                          _CountsComparison(True))(self)
+
+    def read_relations(self, ann_path, tokens=None):
+        return _read_relations(ann_path, tokens, self.untargeted_values)
+
+    def __call__(self, ann_path_1, ann_path_2, tokens=None):
+        return _compare_multisets(self.read_relations(ann_path_1), self.read_relations(ann_path_2))
+
+
+exact_match_instance_relation_evaluation = RelationEvaluation()
+
+
+def _read_relationbound_annotations(ann_path, untargeted_values=UNTARGETED_VALUES):
+    annotations = _parsed(ann_path)
+    untargeted_values = frozenset(untargeted_values)
+    # id -> label of all text-bound annotations
+    labels = {annotation.id: annotation.label for annotation in annotations.textbounds}
+
+    def label_of(id, referenced_by):
+        try:
+            return labels[id]
+        except KeyError:
+            raise TargetNotFoundError(id, referenced_by, None if isinstance(ann_path, ParsedAnnotations) else ann_path)
+
+    # Get targeted aspect terms
+    for annotation in annotations.relations:
+        yield FinalRelAnnotation('R', 'targeted', label_of(annotation.arg1, annotation.id),
+                                 label_of(annotation.arg2, annotation.id))
+
+    # Get untargeted aspect terms, e.g. with value 'YES'
+    for annotation in annotations.attributes:
+        if annotation.value in untargeted_values:
+            yield FinalRelAnnotation('R', 'untargeted', label_of(annotation.target, annotation.id), 'NULL')
+
+
+def _read_tokens(ann_path, tokens):
+    return Counter(_read_token_annotations(ann_path, tokens))
+
+
+def _compare_tokens(exp, pred):
+    return list(counter2list(exp & pred)), list(exp.elements()), list(pred.elements())
+
+
+def _count_tokens(ann_path, tokens, label_ids, vocabulary=None):
+    """
+    Counts-only read phase of exact_match_token_evaluation. Encodes each token-sized annotation as integer key
+    (label id, token start, token end) without creating annotation objects.
+    """
+    annotations = set(_read_textbound_annotations(ann_path))
+    labels = _encode_labels([a.label for a in annotations], label_ids)
+    spans = [(start, end, label) for a, label in zip(annotations, labels.tolist()) for start, end in a.offsets]
+    expanded = tokens.expand(spans)
+    size = tokens.text_length + 1
+    assert (int(expanded[:, 0].max(initial=0)) + 1) * size * size <= np.iinfo(np.int64).max, \
+        'Too many labels or too long text for encoding token annotations as 64 bit keys!'
+    keys = (expanded[:, 0] * size + expanded[:, 1]) * size + expanded[:, 2]
+    keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    return EncodedAnnotations(keys, expanded[first, 0], counts)
+
+
+@evaluation_phases(_read_tokens, _compare_tokens, _count_tokens, _CountsComparison(True))
 def exact_match_token_evaluation(ann_path_1, ann_path_2, tokens=None):
     """
     Annotations are split into token-sized bits before evaluation.
     Sub-token annotations are expanded to full tokens. Long annotations will influence the results more than short
     annotations. Boundary errors for adjacent annotations with the same label are ignored!
     """
-    exp_list = list(_read_token_annotations(ann_path_1, tokens))
-#     print("Exp = ", exp_list)
-#     print("-----------")
-    pred_list = list(_read_token_annotations(ann_path_2, tokens))
-#     print("Pred = ", pred_list)
-    tp = counter2list(Counter(exp_list) & Counter(pred_list))
-#     print("Tp = ", list(tp))
-#     print("**********************************************************")
-    return tp, exp_list, pred_list
+    return _compare_tokens(_read_tokens(ann_path_1, tokens), _read_tokens(ann_path_2, tokens))
 
 
 def counter2list(c):
@@ -181,7 +347,13 @@ def _read_token_annotations(ann_path, tokens):
     Yields a new annotation for each token overlapping with an annotation. If annotations are overlapping each other,
     there will be multiple annotations for a single token.
     """
+    labels, spans = [], []
+    label2id = {}
     for annotation in set(_read_textbound_annotations(ann_path)):
-        for start, end in annotation.offsets:
-            for ts, te in tokens.overlapping_tokens(start, end):
-                yield AspAnnotation(annotation.type, annotation.label, ((ts, te),))
\ No newline at end of file
+        label_id = label2id.setdefault(annotation.label, len(label2id))
+        if label_id == len(labels):
+            labels.append(annotation.label)
+        spans.extend((start, end, label_id) for start, end in annotation.offsets)
+    # expand all spans of the file to tokens at once
+    for label_id, ts, te in tokens.expand(spans).tolist():
+        yield AspAnnotation('T', labels[label_id], ((ts, te),))
@@ -0,0 +1,154 @@
+"""
+Columnar export of the raw counts of an F1Agreement.
+
+The counts are written as one row per non-zero (annotator pair, document, label) with its true positives (tp) and
+totals (total = 2*tp + fp + fn), together with the annotator, document and label dictionaries the integer columns
+refer to. NPZ files only need NumPy; Parquet files (dictionary-encoded string columns, dictionaries in the schema
+metadata) require pyarrow. load_agreement rebuilds an F1Agreement from either without touching the corpus.
+"""
+import json
+
+import numpy as np
+
+from bratiaa.agree import F1Agreement
+from bratiaa.counts import fit_dtype
+from bratiaa.evaluation import exact_match_instance_evaluation
+
+FORMAT_VERSION = 1
+
+# count indices of the (pair, document, count, label) tensor
+TP, TOTAL = 0, 1
+
+
+def export_counts(f1_agreement, path):
+    """
+    Writes the counts of given agreement to path (.npz or .parquet). Requires per-document counts, i.e. not the
+    'aggregate' count backend.
+    """
+    columns = count_columns(f1_agreement)
+    if str(path).endswith('.npz'):
+        _write_npz(path, f1_agreement, columns)
+    elif str(path).endswith('.parquet'):
+        _write_parquet(path, f1_agreement, columns)
+    else:
+        raise ValueError(f'Unknown export format of "{path}" (expected .npz or .parquet)!')
+
+
+def count_columns(f1_agreement):
+    """
+    Dict of the columns pair, document, label, tp and total with one entry per non-zero (pair, document, label).
+    The pair column indexes the annotator pairs (see pair_annotators).
+    """
+    num_pairs, num_documents, _, num_labels = f1_agreement._pdcl.shape
+    p, d, c, l, values = f1_agreement._pdcl.cells()
+    keys = np.ravel_multi_index((p, d, l), (num_pairs, num_documents, num_labels))
+    # total is non-zero whenever tp is, so the rows are given by the non-zero totals
+    total = c == TOTAL
+    row_keys = keys[total]
+    order = np.argsort(row_keys, kind='stable')
+    row_keys, totals = row_keys[order], values[total][order]
+    tps = np.zeros(len(row_keys), dtype=np.int64)
+    tps[np.searchsorted(row_keys, keys[~total])] = values[~total]
+    pairs, documents, labels = np.unravel_index(row_keys, (num_pairs, num_documents, num_labels))
+    return {
+        'pair': pairs.astype(fit_dtype(max(num_pairs - 1, 0))),
+        'document': documents.astype(fit_dtype(max(num_documents - 1, 0))),
+        'label': labels.astype(fit_dtype(max(num_labels - 1, 0))),
+        'tp': tps.astype(fit_dtype(int(tps.max(initial=0)))),
+        'total': totals.astype(fit_dtype(int(totals.max(initial=0)))),
+    }
+
+
+def pair_annotators(annotators):
+    """
+    (pairs, 2) array of the annotator indices of each annotator pair (in the order of F1Agreement's pairs).
+    """
+    num_annotators = len(annotators)
+    first, second = np.triu_indices(num_annotators, k=1)
+    return np.stack((first, second), axis=1)
+
+
+def load_agreement(path, backend=None, eval_func=exact_match_instance_evaluation, token_func=None):
+    """
+    Rebuilds an F1Agreement from counts exported to path (.npz or .parquet). The evaluation and token functions are
+    not part of the export; pass those the counts were computed with to have them reported correctly. The rebuilt
+    agreement is detached from the corpus, so it cannot be updated.
+    """
+    if str(path).endswith('.npz'):
+        annotators, documents, labels, columns = _read_npz(path)
+    elif str(path).endswith('.parquet'):
+        annotators, documents, labels, columns = _read_parquet(path)
+    else:
+        raise ValueError(f'Unknown export format of "{path}" (expected .npz or .parquet)!')
+    f1_agreement = F1Agreement(None, labels, eval_func=eval_func, token_func=token_func, annotators=annotators,
+                               documents=documents, backend=backend, count=False)
+    rows = len(columns['pair'])
+    cells = [np.tile(columns[name].astype(np.int64), 2) for name in ('pair', 'document')]
+    counts = np.repeat([TP, TOTAL], rows)
+    values = np.concatenate((columns['tp'], columns['total'])).astype(np.int64)
+    f1_agreement._pdcl.add_cells(cells[0], cells[1], counts, np.tile(columns['label'].astype(np.int64), 2), values)
+    return f1_agreement
+
+
+def _write_npz(path, f1_agreement, columns):
+    np.savez_compressed(path, version=FORMAT_VERSION,
+                        annotators=np.array(f1_agreement.annotators, dtype=str),
+                        documents=np.array(f1_agreement.documents, dtype=str),
+                        labels=np.array(f1_agreement.labels, dtype=str),
+                        pair_annotators=pair_annotators(f1_agreement.annotators),
+                        **columns)
+
+
+def _read_npz(path):
+    with np.load(path) as npz:
+        _check_version(int(npz['version']))
+        columns = {name: npz[name] for name in ('pair', 'document', 'label', 'tp', 'total')}
+        return npz['annotators'].tolist(), npz['documents'].tolist(), npz['labels'].tolist(), columns
+
+
+def _write_parquet(path, f1_agreement, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    annotators = pa.array(f1_agreement.annotators, type=pa.string())
+    first, second = pair_annotators(f1_agreement.annotators)[columns['pair']].T
+    table = pa.table({
+        'annotator_1': pa.DictionaryArray.from_arrays(pa.array(first, type=pa.int32()), annotators),
+        'annotator_2': pa.DictionaryArray.from_arrays(pa.array(second, type=pa.int32()), annotators),
+        'pair': columns['pair'],
+        'document': pa.DictionaryArray.from_arrays(pa.array(columns['document'], type=pa.int32()),
+                                                   pa.array(f1_agreement.documents, type=pa.string())),
+        'label': pa.DictionaryArray.from_arrays(pa.array(columns['label'], type=pa.int32()),
+                                                pa.array(f1_agreement.labels, type=pa.string())),
+        'tp': columns['tp'],
+        'total': columns['total'],
+    })
+    metadata = {'version': FORMAT_VERSION, 'annotators': f1_agreement.annotators,
+                'documents': f1_agreement.documents, 'labels': f1_agreement.labels}
+    table = table.replace_schema_metadata({b'bratiaa': json.dumps(metadata).encode('utf-8')})
+    pq.write_table(table, path)
+
+
+def _read_parquet(path):
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    metadata = json.loads(table.schema.metadata[b'bratiaa'].decode('utf-8'))
+    _check_version(metadata['version'])
+    columns = {
+        'pair': table.column('pair').to_numpy(),
+        'tp': table.column('tp').to_numpy(),
+        'total': table.column('total').to_numpy(),
+    }
+    for name, dictionary in [('document', metadata['documents']), ('label', metadata['labels'])]:
+        # dictionaries may have been re-encoded when the file was rewritten, so map them to the metadata's
+        ids = {value: i for i, value in enumerate(dictionary)}
+        chunks = table.column(name).combine_chunks()
+        chunk_ids = np.array([ids[value] for value in chunks.dictionary.to_pylist()], dtype=np.int64)
+        columns[name] = chunk_ids[chunks.indices.to_numpy(zero_copy_only=False)]
+    return metadata['annotators'], metadata['documents'], metadata['labels'], columns
+
+
+def _check_version(version):
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported count export version {version} (expected {FORMAT_VERSION})!')
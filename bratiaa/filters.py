@@ -0,0 +1,115 @@
+"""
+Filters selecting the annotations that take part in agreement evaluation.
+
+An AnnotationFilter specifies labels, attributes and relation types to include or exclude. It is compiled once (and
+validated against the project's annotation.conf) into a CompiledFilter with the verdict of each name, which
+bratiaa.parser.parse_ann_file applies while parsing, so excluded annotations are never materialized.
+"""
+from collections import namedtuple
+
+# verdicts of attribute names; attributes may also be decided by their value
+_DROP, _KEEP, _BY_VALUE = False, True, 2
+
+
+class AnnotationFilter(namedtuple('AnnotationFilter', ['labels', 'exclude_labels', 'attributes',
+                                                       'exclude_attributes', 'relations', 'exclude_relations'])):
+    """
+    Specification of the annotations to evaluate. Include lists default to None (everything), exclude lists to
+    empty. Attributes are given by name or as (name, value) tuple. Attributes and relations referencing an excluded
+    text-bound annotation are excluded as well.
+    """
+    __slots__ = ()
+
+    def __new__(cls, labels=None, exclude_labels=(), attributes=None, exclude_attributes=(), relations=None,
+                exclude_relations=()):
+        return super().__new__(cls, _frozen(labels), _frozen(exclude_labels), _frozen(attributes),
+                               _frozen(exclude_attributes), _frozen(relations), _frozen(exclude_relations))
+
+    def compile(self, config=None):
+        """
+        Compiles into a CompiledFilter. If a ProjectConfiguration is given, all labels, attribute names and relation
+        types of the specification must be defined in it.
+        """
+        if config is not None:
+            self._validate('label', self.labels, self.exclude_labels, config.get_entity_types())
+            self._validate('attribute', _names(self.attributes), _names(self.exclude_attributes),
+                           config.get_attribute_types())
+            self._validate('relation type', self.relations, self.exclude_relations, config.get_relation_types())
+        return CompiledFilter(self)
+
+    @staticmethod
+    def _validate(kind, include, exclude, defined):
+        unknown = ((include or frozenset()) | exclude) - set(defined)
+        if unknown:
+            raise ValueError(f'Filter refers to {kind}s not defined in annotation.conf: {", ".join(sorted(unknown))}')
+
+    @property
+    def key(self):
+        """
+        Stable string representation, e.g. for cache keys.
+        """
+        return repr(tuple(None if field is None else sorted(field, key=repr) for field in self))
+
+
+class CompiledFilter:
+    """
+    Lookup tables of an AnnotationFilter, mapping each name seen in the specification to its verdict. All other names
+    get the verdict of the table's default.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.key = spec.key
+        self._labels, self._other_labels = _table(spec.labels, spec.exclude_labels)
+        self._relations, self._other_relations = _table(spec.relations, spec.exclude_relations)
+        self._include_all = spec.attributes is None
+        self._include_names = frozenset(a for a in spec.attributes or () if not isinstance(a, tuple))
+        self._include_values = frozenset(a for a in spec.attributes or () if isinstance(a, tuple))
+        self._exclude_values = frozenset(a for a in spec.exclude_attributes if isinstance(a, tuple))
+        exclude_names = frozenset(a for a in spec.exclude_attributes if not isinstance(a, tuple))
+        self._attributes = {name: self._attribute_verdict(name, exclude_names)
+                            for name in _names(spec.attributes) | _names(spec.exclude_attributes)}
+        self._other_attributes = _KEEP if self._include_all else _DROP
+
+    def _attribute_verdict(self, name, exclude_names):
+        if name in exclude_names:
+            return _DROP
+        if self._include_all or name in self._include_names:
+            return _BY_VALUE if name in _names(self._exclude_values) else _KEEP
+        return _BY_VALUE if name in _names(self._include_values) else _DROP
+
+    def keep_textbound(self, label):
+        return self._labels.get(label, self._other_labels)
+
+    def keep_relation(self, type):
+        return self._relations.get(type, self._other_relations)
+
+    def keep_attribute(self, name, value):
+        verdict = self._attributes.get(name, self._other_attributes)
+        if verdict != _BY_VALUE:
+            return verdict
+        if (name, value) in self._exclude_values:
+            return False
+        return self._include_all or name in self._include_names or (name, value) in self._include_values
+
+
+def _table(include, exclude):
+    verdicts = {name: (include is None or name in include) and name not in exclude
+                for name in (include or frozenset()) | exclude}
+    return verdicts, include is None  # any other name
+
+
+def _frozen(values):
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return frozenset(tuple(v) if isinstance(v, list) else v for v in values)
+
+
+def _names(attributes):
+    return frozenset(a[0] if isinstance(a, tuple) else a for a in attributes or ())
+
+
+# we don't want NUM to be calculated for now (default of instance and token evaluation, cf. bratiaa.evaluation)
+DEFAULT_FILTER = AnnotationFilter(exclude_labels=['NUM'])
@@ -0,0 +1,95 @@
+"""
+Heatmaps of square agreement matrices.
+
+draw_heatmap renders with matplotlib's object-oriented API on the Agg canvas, so no global pyplot state is involved
+and nothing is left behind after saving. write_png encodes the matrix directly as PNG image with NumPy and zlib, which
+scales to very large numbers of annotators and does not need matplotlib at all.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+# per-cell values are only written into heatmaps of up to this many rows
+MAX_ANNOTATED_SIZE = 20
+
+# anchor colors of the viridis color map (from 0 to 1)
+VIRIDIS = np.array([[68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37]], dtype=np.float64)
+
+NAN_COLOR = (128, 128, 128)
+
+
+def draw_heatmap(matrix, labels, out_path, max_annotated_size=MAX_ANNOTATED_SIZE):
+    """
+    Draws heatmap of given square matrix with the given row/column labels and saves it to out_path (format
+    determined by file extension).
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    size = len(labels)
+    # grow figure with the number of annotators, so labels stay readable
+    inches = max(6.4, 0.25 * size)
+    fig = Figure(figsize=(inches, inches * 0.75))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    im = ax.imshow(matrix)
+    # ticks and labels
+    ax.set_xticks(np.arange(size))
+    ax.set_yticks(np.arange(size))
+    # show complete grid
+    ax.set_ylim(size - 0.5, -0.5)
+    ax.set_xticklabels(labels, rotation=45, ha='right', rotation_mode='anchor')
+    ax.set_yticklabels(labels)
+    if size <= max_annotated_size:
+        for (i, j), value in np.ndenumerate(matrix):
+            ax.text(j, i, f'{value:.2f}', ha='center', va='center', color='w')
+
+    # color bar
+    cbar = fig.colorbar(im, ax=ax)
+    cbar.ax.set_ylabel('F1 score', rotation=-90, va='bottom')
+
+    fig.tight_layout()
+    fig.savefig(out_path)
+    fig.clear()
+
+
+def write_png(matrix, out_path, cell_size=4):
+    """
+    Writes given matrix with values in [0, 1] as PNG image with cell_size x cell_size pixels per cell, colored with
+    the viridis color map (NaN in gray).
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rgb = colorize(matrix)
+    pixels = np.repeat(np.repeat(rgb, cell_size, axis=0), cell_size, axis=1)
+    with open(out_path, 'wb') as fout:
+        fout.write(encode_png(pixels))
+
+
+def colorize(matrix):
+    """
+    Maps values in [0, 1] to (..., 3) uint8 RGB colors by linear interpolation between the viridis anchor colors.
+    """
+    # nan_to_num only accepts the nan replacement as of NumPy 1.17
+    values = np.clip(np.where(np.isnan(matrix), 0, matrix), 0, 1) * (len(VIRIDIS) - 1)
+    lower = np.minimum(values.astype(np.int64), len(VIRIDIS) - 2)
+    weight = (values - lower)[..., np.newaxis]
+    rgb = VIRIDIS[lower] * (1 - weight) + VIRIDIS[lower + 1] * weight
+    rgb[np.isnan(matrix)] = NAN_COLOR
+    return np.round(rgb).astype(np.uint8)
+
+
+def encode_png(pixels):
+    """
+    Encodes (height, width, 3) uint8 array as PNG.
+    """
+    height, width, _ = pixels.shape
+    # each scanline starts with filter type 0 (none)
+    scanlines = np.concatenate((np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 3)), axis=1)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8 bit RGB
+    return b'\x89PNG\r\n\x1a\n' + _chunk(b'IHDR', header) + _chunk(b'IDAT', zlib.compress(scanlines.tobytes())) \
+        + _chunk(b'IEND', b'')
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
@@ -0,0 +1,102 @@
+"""
+Sinks for the messages bratsubset's Messager emits (e.g. for malformed ANN lines).
+
+By default the Messager keeps all messages for output in the brat server, which grows without limit in long-running
+processes. set_message_sink routes them to logging, a bounded ring buffer or nowhere instead. While documents are
+counted, their messages are collected per document (see collect_messages) and reported with the agreement results.
+"""
+import logging
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+from bratsubset.message import Messager
+
+Message = namedtuple('Message', ['type', 'text'])
+
+# at most this many messages are collected per document
+MAX_DOCUMENT_MESSAGES = 100
+
+# default capacity of RingBufferSink
+MAX_MESSAGES = 10000
+
+LOG_LEVELS = {'debug': logging.DEBUG, 'comment': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+# Messager method emitting each type of message
+EMITTERS = {'debug': Messager.debug, 'comment': Messager.info, 'warning': Messager.warning, 'error': Messager.error}
+
+
+class LoggingSink:
+    """
+    Logs messages with the level corresponding to their type.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger('bratsubset')
+
+    def __call__(self, msg, type, duration=None):
+        self.logger.log(LOG_LEVELS.get(type, logging.INFO), msg)
+
+
+class RingBufferSink:
+    """
+    Keeps the most recent maxlen messages.
+    """
+
+    def __init__(self, maxlen=MAX_MESSAGES):
+        self.messages = deque(maxlen=maxlen)
+
+    def __call__(self, msg, type, duration=None):
+        self.messages.append(Message(type, msg))
+
+    def drain(self):
+        """
+        Returns and removes all buffered messages.
+        """
+        messages = list(self.messages)
+        self.messages.clear()
+        return messages
+
+
+def drop(msg, type, duration=None):
+    pass
+
+
+def set_message_sink(sink):
+    """
+    Routes all Messager messages to given sink: 'logging', 'ring' (RingBufferSink), 'drop', any callable taking
+    (msg, type, duration) or None (the Messager's default). Returns the sink in use.
+    """
+    if sink == 'logging':
+        sink = LoggingSink()
+    elif sink == 'ring':
+        sink = RingBufferSink()
+    elif sink == 'drop':
+        sink = drop
+    elif sink is not None and not callable(sink):
+        raise ValueError(f'Unknown message sink "{sink}"!')
+    Messager.set_sink(sink)
+    return sink
+
+
+@contextmanager
+def collect_messages(maxlen=MAX_DOCUMENT_MESSAGES):
+    """
+    Collects the messages emitted inside the with block into the yielded list (filled with at most maxlen messages
+    when the block is left) instead of passing them to the current sink.
+    """
+    buffer = RingBufferSink(maxlen)
+    previous = Messager.set_sink(buffer)
+    messages = []
+    try:
+        yield messages
+    finally:
+        Messager.set_sink(previous)
+        messages.extend(buffer.messages)
+
+
+def replay_messages(messages):
+    """
+    Emits given messages again, e.g. those recorded while parsing a file that is now read from a cache.
+    """
+    for message in messages:
+        EMITTERS.get(message.type, Messager.info)(message.text)
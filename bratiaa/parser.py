@@ -0,0 +1,152 @@
+"""
+Streaming read-only parser for brat ANN files.
+
+Produces plain tuples for the annotation types needed for agreement evaluation (text-bound annotations, attributes
+and relations) without the bookkeeping of bratsubset.annotation.Annotations. Malformed lines are skipped and reported
+the same way: error messages go to the Messager and the line numbers are recorded in failed_lines. Other annotation
+types (events, equivs, normalizations, comments) are skipped without validation. An optional
+bratiaa.filters.CompiledFilter drops unwanted annotations before they are created.
+"""
+from collections import namedtuple
+from re import compile as re_compile
+
+from bratsubset.annotation import open_textfile, InvalidIdError
+from bratsubset.message import Messager
+
+TextBound = namedtuple('TextBound', ['id', 'label', 'spans'])
+
+Attribute = namedtuple('Attribute', ['id', 'name', 'target', 'value'])
+
+Relation = namedtuple('Relation', ['id', 'type', 'arg1', 'arg2'])
+
+ParsedAnnotations = namedtuple('ParsedAnnotations', ['textbounds', 'attributes', 'relations', 'failed_lines'])
+
+VALID_ID = re_compile(r'^([A-Za-z]+|#[A-Za-z]*)([0-9]+)(.*?)$')
+ATTRIBUTE = re_compile(r'(.+?) (.+?) (.+?)$')
+ATTRIBUTE_WITHOUT_VALUE = re_compile(r'(.+?) (.+?)$')
+
+
+class _MalformedLine(Exception):
+    pass
+
+
+def parse_ann_file(ann_path, annotation_filter=None):
+    """
+    Parses given ANN file into a ParsedAnnotations tuple, keeping only annotations accepted by the given
+    CompiledFilter (if any).
+    """
+    textbounds, attributes, relations, failed_lines = [], [], [], []
+    ids = set()
+    excluded = set()  # ids of filtered text-bound annotations
+    references = []  # (referenced id, line) to check after parsing
+    with open_textfile(ann_path) as ann_file:
+        for line_num, line in enumerate(ann_file):
+            id = None
+            try:
+                id, id_tail = _split_id(line)
+                pre = id[0]
+                if id in ids and pre != '*':
+                    # duplicate id
+                    id = None
+                    raise _MalformedLine()
+                data = id_tail.split('\t', 1)[0]
+                if pre == 'T':
+                    if annotation_filter and not annotation_filter.keep_textbound(data.split(' ', 1)[0]):
+                        excluded.add(id)
+                        continue
+                    textbounds.append(_parse_textbound(id, data))
+                elif pre == 'A' or pre == 'M':
+                    attribute = _parse_attribute(id, data, pre)
+                    references.append((attribute.target, line))
+                    if annotation_filter and not annotation_filter.keep_attribute(attribute.name, attribute.value):
+                        continue
+                    attributes.append(attribute)
+                elif pre == 'R':
+                    if annotation_filter and not annotation_filter.keep_relation(data.split(' ', 1)[0]):
+                        continue
+                    relation = _parse_relation(id, data)
+                    relations.append(relation)
+                    references.append((relation.arg1, line))
+                    references.append((relation.arg2, line))
+                elif pre not in 'NE*#':
+                    raise _MalformedLine()
+            except _MalformedLine:
+                failed_lines.append(line_num)
+            finally:
+                # like in Annotations, ids of lines that could not be parsed completely are still defined
+                if id is not None and id != '*':
+                    ids.add(id)
+    for rid, line in references:
+        if rid not in ids:
+            Messager.error('ID ' + rid + ' not defined, referenced from annotation ' + line.rstrip('\r\n'))
+    if excluded:
+        # annotations referencing filtered text-bound annotations are filtered as well
+        attributes = [a for a in attributes if a.target not in excluded]
+        relations = [r for r in relations if r.arg1 not in excluded and r.arg2 not in excluded]
+    return ParsedAnnotations(textbounds, attributes, relations, failed_lines)
+
+
+def _split_id(line):
+    try:
+        id, id_tail = line.split('\t', 1)
+    except ValueError:
+        raise _MalformedLine()
+    if not id or id[0].isdigit():
+        raise InvalidIdError(id)
+    if id != '*' and VALID_ID.match(id) is None:
+        raise _MalformedLine()
+    return id, id_tail
+
+
+def _parse_textbound(id, data):
+    try:
+        label, rest = data.split(' ', 1)
+        spans = []
+        for span_str in rest.split(';'):
+            start_str, end_str = span_str.split(' ', 2)
+            end_str = end_str.rstrip()
+            if any(c.isspace() for c in end_str):
+                Messager.error('Error parsing textbound "%s\t%s". (Using space instead of tab?)' % (id, data))
+                raise _MalformedLine()
+            spans.append((int(start_str), int(end_str)))
+    except ValueError:
+        raise _MalformedLine()
+    return TextBound(id, label, tuple(spans))
+
+
+def _parse_attribute(id, data, pre):
+    if pre == 'M':
+        # old modifier format without value
+        try:
+            name, target = data.split()
+        except ValueError:
+            raise _MalformedLine()
+        return Attribute(id, name, target, True)
+    match = ATTRIBUTE.match(data)
+    if match is None:
+        match = ATTRIBUTE_WITHOUT_VALUE.match(data)
+        if match is None:
+            raise _MalformedLine()
+        (name, target), value = match.groups(), True
+    else:
+        name, target, value = match.groups()
+    if VALID_ID.match(target) is None:
+        raise _MalformedLine()
+    return Attribute(id, name, target, value)
+
+
+def _parse_relation(id, data):
+    try:
+        type, type_tail = data.split(' ', 1)
+    except ValueError:
+        raise _MalformedLine()
+    args = [arg.split(':') for arg in type_tail.split()]
+    if len(args) != 2:
+        Messager.error('Error parsing relation: must have exactly two arguments')
+        raise _MalformedLine()
+    if args[0][0] == args[1][0]:
+        Messager.error('Error parsing relation: arguments must not be identical')
+        raise _MalformedLine()
+    if len(args[0]) < 2 or len(args[1]) < 2:
+        raise _MalformedLine()
+    return Relation(id, type, args[0][1], args[1][1])
@@ -0,0 +1,164 @@
+"""
+Stage-level timing of agreement computations.
+
+The pipeline marks its stages (indexing the project, reading and tokenizing texts, parsing ANN files, reading
+annotations for evaluation, pair-wise evaluation and accumulating counts) with stage(name). Unless a Profile is
+active (see profiling), stage returns a shared no-op context manager, so instrumentation costs next to nothing.
+
+    with profiling(top=10) as profile:
+        f1_agreement = compute_f1_agreement(project_root)
+    print(json.dumps(profile.summary()))
+"""
+import heapq
+import time
+from contextlib import contextmanager
+
+# stages in pipeline order (others may be added by custom code)
+STAGES = ['index', 'read_text', 'tokenize', 'parse', 'read', 'evaluate', 'accumulate']
+
+# number of slowest documents kept by default
+TOP_DOCUMENTS = 10
+
+_active = None  # Profile collecting the current stage timings (if any)
+
+
+class Profile:
+    """
+    Cumulative time and number of calls per stage, counters (e.g. of parsed files and annotations), per-document
+    wall times and the slowest documents. If given, on_document is called with (document id, seconds) whenever a
+    document has been counted.
+    """
+
+    def __init__(self, top=TOP_DOCUMENTS, on_document=None):
+        self.top = top
+        self.on_document = on_document
+        self.stages = {}  # stage -> [seconds, calls]
+        self.counters = {}  # name -> count
+        self.documents = {}  # document id -> seconds (summed over all counting passes)
+        self._slowest = []  # min-heap of (seconds, document id)
+
+    def add_time(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_document(self, doc_id, seconds):
+        self.documents[doc_id] = self.documents.get(doc_id, 0.0) + seconds
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, (seconds, doc_id))
+        elif self._slowest and seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, doc_id))
+        if self.on_document:
+            self.on_document(doc_id, seconds)
+
+    def merge(self, other):
+        """
+        Adds the stage timings, counters and documents of another profile (e.g. recorded in a worker process).
+        """
+        for name, (seconds, calls) in other.stages.items():
+            self.add_time(name, seconds, calls)
+        for name, n in other.counters.items():
+            self.count(name, n)
+        for doc_id, seconds in other.documents.items():
+            self.add_document(doc_id, seconds)
+
+    def slowest_documents(self):
+        """
+        List of (document id, seconds) of the slowest documents, slowest first.
+        """
+        return [(doc_id, seconds) for seconds, doc_id in sorted(self._slowest, reverse=True)]
+
+    def summary(self):
+        """
+        JSON-serializable summary (per-document times only for the slowest documents).
+        """
+        order = {name: i for i, name in enumerate(STAGES)}
+        return {
+            'stages': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls)
+                       in sorted(self.stages.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))},
+            'counters': dict(sorted(self.counters.items())),
+            'documents': len(self.documents),
+            'document_seconds': sum(self.documents.values()),
+            'slowest_documents': [{'document': doc_id, 'seconds': seconds}
+                                  for doc_id, seconds in self.slowest_documents()],
+        }
+
+
+class _Timer:
+    __slots__ = ['record', 'key', 'start']
+
+    def __init__(self, record, key):
+        self.record = record
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class _NoTimer:
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def stage(name):
+    """
+    Context manager adding the time spent inside the with block to given stage of the active profile.
+    """
+    if _active is None:
+        return _NO_TIMER
+    return _Timer(_active.add_time, name)
+
+
+def document(doc_id):
+    """
+    Context manager recording the time spent inside the with block as time of given document in the active profile.
+    """
+    if _active is None:
+        return _NO_TIMER
+    return _Timer(_active.add_document, doc_id)
+
+
+def active_profile():
+    """
+    The Profile collecting stage timings or None if profiling is disabled.
+    """
+    return _active
+
+
+def count(name, n=1):
+    """
+    Increments given counter of the active profile (if any).
+    """
+    if _active is not None:
+        _active.count(name, n)
+
+
+@contextmanager
+def profiling(top=TOP_DOCUMENTS, on_document=None, profile=None):
+    """
+    Collects the stage timings of agreement computations inside the with block into the yielded Profile (a new one
+    unless given).
+    """
+    global _active
+    previous = _active
+    _active = profile if profile is not None else Profile(top, on_document)
+    try:
+        yield _active
+    finally:
+        _active = previous
@@ -0,0 +1,68 @@
+"""
+Sinks for per-document agreement written while documents are counted.
+
+F1Agreement passes each document's mean and standard deviation of the pair-wise F1 scores to its document_sink as
+soon as the document is counted, e.g. to keep per-document results of the 'aggregate' count backend.
+"""
+import csv
+import json
+import math
+
+FIELDS = ['document', 'mean_f1', 'sd_f1']
+
+
+class _DocumentSink:
+    def __init__(self, out):
+        if hasattr(out, 'write'):
+            self._file, self._owned = out, False
+        else:
+            self._file, self._owned = open(out, 'w', encoding='utf-8', newline=''), True
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class CsvDocumentSink(_DocumentSink):
+    """
+    Writes one CSV row (document, mean_f1, sd_f1) per document to given path or text file object.
+    """
+
+    def __init__(self, out):
+        super().__init__(out)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(FIELDS)
+
+    def __call__(self, doc_id, mean, sd):
+        self._writer.writerow([doc_id, float(mean), float(sd)])
+
+
+class JsonlDocumentSink(_DocumentSink):
+    """
+    Writes one JSON object {"document", "mean_f1", "sd_f1"} per line to given path or text file object (NaN
+    scores, e.g. of documents without annotations, become null).
+    """
+
+    def __call__(self, doc_id, mean, sd):
+        values = [doc_id] + [None if math.isnan(v) else float(v) for v in (mean, sd)]
+        self._file.write(json.dumps(dict(zip(FIELDS, values))) + '\n')
+
+
+def open_document_sink(path):
+    """
+    Opens a CSV or JSONL sink depending on the extension of given path (.csv, .jsonl or .json).
+    """
+    if str(path).endswith('.csv'):
+        return CsvDocumentSink(path)
+    if str(path).endswith(('.jsonl', '.json')):
+        return JsonlDocumentSink(path)
+    raise ValueError(f'Unknown per-document output format of "{path}" (expected .csv or .jsonl)!')
@@ -17,37 +17,82 @@ def read(path, encoding=ENCODING, newline='\r\n', mode='r'):
         return fin.read()
 
 
+# documents up to this length use a per-character lookup table, longer ones binary search on token offsets
+MAX_CHAR_TABLE_LENGTH = 2 ** 20
+
+
 class TokenOverlap:
     """
     Data structure for quick lookup of tokens overlapping with given span.
     Assumes that the provided list of tokens is sorted by indices!
+
+    Short documents use a per-character table of token indices (with the smallest fitting integer dtype), long
+    documents binary search on the sorted token start offsets to keep memory proportional to the number of tokens.
     """
 
     def __init__(self, text, tokens):
         self.tokens = tokens
-        self.char2token = self.compute_mapping(len(text), tokens)
+        self.text_length = len(text)
+        self.offsets = np.array(tokens, dtype=np.int64).reshape(-1, 2)
+        self.starts = self.offsets[:, 0]
+        self.char2token = None
+        if self.text_length <= MAX_CHAR_TABLE_LENGTH:
+            self.char2token = self.compute_mapping(self.text_length, tokens)
 
     @staticmethod
     def compute_mapping(text_length, tokens):
-        char2token = np.zeros(text_length, dtype=int)
-        i = 0
-        for token_idx, (start, end) in enumerate(tokens):
-            char2token[i:start] = token_idx - 1
-            char2token[start:end] = token_idx
-            i = end
-        char2token[i:text_length] = len(tokens) - 1
+        """
+        Maps each character offset to the index of the last token starting at or before it (-1 before first token).
+        """
+        dtype = np.result_type(np.min_scalar_type(-1), np.min_scalar_type(len(tokens)))
+        char2token = np.zeros(text_length, dtype=dtype)
+        starts = np.array([start for start, _ in tokens], dtype=np.int64)
+        np.add.at(char2token, starts[starts < text_length], 1)
+        np.cumsum(char2token, out=char2token)
+        char2token -= 1
         return char2token
 
+    def token_at(self, offset):
+        """
+        Index of the last token starting at or before given character offset (-1 before first token). Also accepts
+        an array of offsets.
+        """
+        if self.char2token is not None:
+            return self.char2token[offset]
+        return np.searchsorted(self.starts, offset, side='right') - 1
+
     def overlapping_tokens(self, start, end):
-        assert end <= len(self.char2token), f'End index {end} > text length {len(self.char2token)}!'
+        assert end <= self.text_length, f'End index {end} > text length {self.text_length}!'
         if end < 1 or start >= end:
             return []
-        start_token = self.char2token[start]
+        start_token = self.token_at(start)
         if start_token == -1: # start offset before first token
             start_token = 0
         if self.tokens[start_token][1] <= start: # start offset between two tokens
             start_token += 1
-        end_token = self.char2token[end - 1] # end offset is exclusive
+        end_token = self.token_at(end - 1) # end offset is exclusive
         if end_token < 0 or end_token < start_token:
             return []
         return self.tokens[start_token:end_token + 1]
+
+    def expand(self, spans):
+        """
+        Batched overlapping_tokens for an (n, 3) array of (start, end, label id) spans. Returns an (m, 3) array with
+        one (label id, token start, token end) row per token overlapping with a span, in the order of the spans.
+        """
+        spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+        starts, ends, labels = spans[:, 0], spans[:, 1], spans[:, 2]
+        assert np.all(ends <= self.text_length), f'End index {ends.max()} > text length {self.text_length}!'
+        if len(self.tokens) == 0 or self.text_length == 0:
+            return np.zeros((0, 3), dtype=np.int64)
+        valid = (ends >= 1) & (starts < ends)
+        start_tokens = np.maximum(self.token_at(np.clip(starts, 0, self.text_length - 1)), 0)
+        # start offset between two tokens
+        start_tokens += self.offsets[start_tokens, 1] <= starts
+        end_tokens = self.token_at(np.clip(ends - 1, 0, self.text_length - 1))  # end offset is exclusive
+        counts = np.where(valid, end_tokens - start_tokens + 1, 0).clip(min=0)
+        # token indices of all spans concatenated: start token of each span plus position within the span
+        first = np.repeat(start_tokens, counts)
+        within = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        token_indices = first + within
+        return np.column_stack((np.repeat(labels, counts), self.offsets[token_indices]))
@@ -0,0 +1,41 @@
+"""
+Polling-based watching of annotation projects for changed files.
+"""
+import time
+
+from bratiaa.agree import ProjectIndex
+
+
+def watch_project(index, interval=1.0, debounce=2.0, max_delay=30.0):
+    """
+    Polls the project of the given ProjectIndex for changed ANN and TXT files and yields (new index, changes), where
+    changes is the result of ProjectIndex.changed_documents.
+
+    Bursts of saves (e.g. a bulk import) are batched: after the first change, polling continues until no further
+    change has been seen for debounce seconds or max_delay seconds have passed since the first change.
+    """
+    while True:
+        time.sleep(interval)
+        latest = _rescan(index)
+        if _unchanged(index, latest):
+            continue
+        first_change = last_change = time.monotonic()
+        while time.monotonic() - last_change < debounce and time.monotonic() - first_change < max_delay:
+            time.sleep(interval)
+            newer = _rescan(latest)
+            if not _unchanged(latest, newer):
+                latest, last_change = newer, time.monotonic()
+        yield latest, index.changed_documents(latest)
+        index = latest
+
+
+def _rescan(index):
+    try:
+        return ProjectIndex(index.root)
+    except FileNotFoundError:
+        # files or directories vanished while scanning, try again with the next poll
+        return index
+
+
+def _unchanged(index, other):
+    return index.annotators == other.annotators and index.stats == other.stats
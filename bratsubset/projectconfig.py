@@ -12,8 +12,11 @@ Author:     Illes Solt          <solt tmit bme hu>
 Version:    2011-08-15
 """
 
+import os
 import re
 import sys
+import time
+from collections import OrderedDict
 import urllib.parse  # TODO reduce scope
 import urllib.robotparser  # TODO reduce scope
 
@@ -34,6 +37,12 @@ __annotation_config_filename = 'annotation.conf'
 __visual_config_filename = 'visual.conf'
 __tools_config_filename = 'tools.conf'
 __kb_shortcut_filename = 'kb_shortcuts.conf'
+__config_filenames = [
+    __access_control_filename,
+    __annotation_config_filename,
+    __visual_config_filename,
+    __tools_config_filename,
+    __kb_shortcut_filename]
 
 # annotation config section name constants
 ENTITY_SECTION = "entities"
@@ -178,6 +187,109 @@ reserved_config_string = ["<%s>" % n for n in reserved_config_name]
 SEPARATOR_STR = "SEPARATOR"
 
 
+class ConfigCache(object):
+    """Per-process cache of values derived from project configuration files.
+
+    Entries are grouped by project directory. The entries of a directory
+    are dropped when a configuration file that was (or would be) read for
+    it changes its modification time; files are checked at most once per
+    check_interval seconds. At most max_directories directories are kept,
+    the least recently used ones are evicted first.
+    """
+
+    def __init__(self, max_directories=64, check_interval=1.0):
+        self.max_directories = max_directories
+        self.check_interval = check_interval
+        # directory -> [file stamps, time of last check, {table: {key: value}}]
+        self.__entries = OrderedDict()
+
+    def table(self, name):
+        """Returns a dict-like view on the cached values of one lookup
+        function, keyed by directory or tuples starting with the
+        directory."""
+        return _ConfigCacheTable(self, name)
+
+    def values(self, directory, name):
+        """Returns the (mutable) dict of cached values of given lookup
+        function for given directory."""
+        entry = self.__entries.get(directory)
+        now = time.monotonic()
+        if entry is not None and now - entry[1] >= self.check_interval:
+            if _config_stamps(directory) != entry[0]:
+                del self.__entries[directory]
+                entry = None
+            else:
+                entry[1] = now
+        if entry is None:
+            entry = [_config_stamps(directory), now, {}]
+            self.__entries[directory] = entry
+            while len(self.__entries) > self.max_directories:
+                self.__entries.popitem(last=False)
+        self.__entries.move_to_end(directory)
+        return entry[2].setdefault(name, {})
+
+    def evict(self, directory=None):
+        """Drops all cached values of given directory (all directories if
+        None)."""
+        if directory is None:
+            self.__entries.clear()
+        else:
+            self.__entries.pop(directory, None)
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class _ConfigCacheTable(object):
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def __values(self, key):
+        directory = key[0] if isinstance(key, tuple) else key
+        return self.cache.values(directory, self.name)
+
+    def __contains__(self, key):
+        return key in self.__values(key)
+
+    def __getitem__(self, key):
+        return self.__values(key)[key]
+
+    def __setitem__(self, key, value):
+        self.__values(key)[key] = value
+
+    def get(self, key, default=None):
+        return self.__values(key).get(key, default)
+
+
+def _config_stamps(directory):
+    # (path, mtime) of each configuration file found when searching from
+    # directory towards the file system root (like
+    # __read_first_in_directory_tree), including the paths searched before
+    stamps = []
+    for filename in __config_filenames:
+        d = directory
+        while d is not None and "/" in d:
+            path = os.path.join(d, filename)
+            try:
+                stamps.append((path, os.stat(path).st_mtime_ns))
+                break
+            except OSError:
+                stamps.append((path, None))
+            parent = os.path.split(d)[0]
+            if parent == d:
+                break
+            d = parent
+    return tuple(stamps)
+
+
+# cache for all lookups by project directory
+config_cache = ConfigCache()
+
+# default of cache lookups where None is a valid value
+_MISSING = object()
+
+
 def normalize_to_storage_form(t):
     """Given a label, returns a form of the term that can be used for disk
     storage.
@@ -619,7 +731,10 @@ def __read_first_in_directory_tree(directory, filename):
             result = __read_or_default(source, None)
             if result is not None:
                 break
-            directory = split(directory)[0]
+            parent = split(directory)[0]
+            if parent == directory:
+                break
+            directory = parent
 
     return (result, source)
 
@@ -684,7 +799,9 @@ def get_configs(
         minconf,
         sections,
         optional_sections):
-    if (directory, filename) not in get_configs.__cache:
+    cache = config_cache.table('get_configs')
+    entry = cache.get((directory, filename))
+    if entry is None:
         configstr, source = __read_first_in_directory_tree(directory, filename)
 
         if configstr is None:
@@ -727,12 +844,9 @@ def get_configs(
                     r.special_arguments["<REL-TYPE>"] = ["symmetric",
                                                          "transitive"]
 
-        get_configs.__cache[(directory, filename)] = (configs, section_labels)
-
-    return get_configs.__cache[(directory, filename)]
+        entry = cache[(directory, filename)] = (configs, section_labels)
 
-
-get_configs.__cache = {}
+    return entry
 
 
 def __get_access_control(directory, filename, default_rules):
@@ -851,8 +965,9 @@ def get_annotation_config_section_labels(directory):
 
 
 def get_labels(directory):
-    cache = get_labels.__cache
-    if directory not in cache:
+    cache = config_cache.table('get_labels')
+    l = cache.get(directory)
+    if l is None:
         l = {}
         for t in get_visual_configs(directory)[0][LABEL_SECTION]:
             if t.storage_form() in l:
@@ -862,26 +977,21 @@ def get_labels(directory):
             # first is storage for, rest are labels.
             l[t.storage_form()] = t.terms[1:]
         cache[directory] = l
-    return cache[directory]
-
-
-get_labels.__cache = {}
+    return l
 
 
 # TODO: too much caching?
 
 
 def get_drawing_types(directory):
-    cache = get_drawing_types.__cache
-    if directory not in cache:
+    cache = config_cache.table('get_drawing_types')
+    types = cache.get(directory)
+    if types is None:
         l = set()
         for n in get_drawing_config(directory):
             l.add(n.storage_form())
-        cache[directory] = list(l)
-    return cache[directory]
-
-
-get_drawing_types.__cache = {}
+        types = cache[directory] = list(l)
+    return types
 
 
 def get_option_config(directory):
@@ -921,32 +1031,29 @@ def get_tools_config_section_labels(directory):
 
 
 def get_access_control(directory):
-    cache = get_access_control.__cache
-    if directory not in cache:
+    cache = config_cache.table('get_access_control')
+    # None (rules that could not be parsed) is cached as well
+    a = cache.get(directory, _MISSING)
+    if a is _MISSING:
         a = __get_access_control(directory,
                                  __access_control_filename,
                                  __default_access_control)
         cache[directory] = a
 
-    return cache[directory]
-
-
-get_access_control.__cache = {}
+    return a
 
 
 def get_kb_shortcuts(directory):
-    cache = get_kb_shortcuts.__cache
-    if directory not in cache:
+    cache = config_cache.table('get_kb_shortcuts')
+    a = cache.get(directory)
+    if a is None:
         a = __get_kb_shortcuts(directory,
                                __kb_shortcut_filename,
                                __default_kb_shortcuts,
                                {"P": "Positive_regulation"})
         cache[directory] = a
 
-    return cache[directory]
-
-
-get_kb_shortcuts.__cache = {}
+    return a
 
 
 def __collect_type_list(node, collected):
@@ -975,96 +1082,81 @@ def __type_hierarchy_to_list(hierarchy):
 
 
 def get_entity_type_list(directory):
-    cache = get_entity_type_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_entity_type_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_entity_type_hierarchy(directory))
-    return cache[directory]
-
-
-get_entity_type_list.__cache = {}
+    return types
 
 
 def get_event_type_list(directory):
-    cache = get_event_type_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_event_type_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_event_type_hierarchy(directory))
-    return cache[directory]
-
-
-get_event_type_list.__cache = {}
+    return types
 
 
 def get_relation_type_list(directory):
-    cache = get_relation_type_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_relation_type_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_relation_type_hierarchy(directory))
-    return cache[directory]
-
-
-get_relation_type_list.__cache = {}
+    return types
 
 
 def get_attribute_type_list(directory):
-    cache = get_attribute_type_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_attribute_type_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_attribute_type_hierarchy(directory))
-    return cache[directory]
-
-
-get_attribute_type_list.__cache = {}
+    return types
 
 
 def get_search_config_list(directory):
-    cache = get_search_config_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_search_config_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_search_config(directory))
-    return cache[directory]
-
-
-get_search_config_list.__cache = {}
+    return types
 
 
 def get_annotator_config_list(directory):
-    cache = get_annotator_config_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_annotator_config_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_annotator_config(directory))
-    return cache[directory]
-
-
-get_annotator_config_list.__cache = {}
+    return types
 
 
 def get_disambiguator_config_list(directory):
-    cache = get_disambiguator_config_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_disambiguator_config_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_disambiguator_config(directory))
-    return cache[directory]
-
-
-get_disambiguator_config_list.__cache = {}
+    return types
 
 
 def get_normalization_config_list(directory):
-    cache = get_normalization_config_list.__cache
-    if directory not in cache:
-        cache[directory] = __type_hierarchy_to_list(
+    cache = config_cache.table('get_normalization_config_list')
+    types = cache.get(directory)
+    if types is None:
+        types = cache[directory] = __type_hierarchy_to_list(
             get_normalization_config(directory))
-    return cache[directory]
-
-
-get_normalization_config_list.__cache = {}
+    return types
 
 
 def get_node_by_storage_form(directory, term):
-    cache = get_node_by_storage_form.__cache
-    if directory not in cache:
+    cache = config_cache.table('get_node_by_storage_form')
+    d = cache.get(directory)
+    if d is None:
         d = {}
         for e in get_entity_type_list(
                 directory) + get_event_type_list(directory):
@@ -1076,14 +1168,12 @@ def get_node_by_storage_form(directory, term):
             d[t] = e
         cache[directory] = d
 
-    return cache[directory].get(term, None)
-
-
-get_node_by_storage_form.__cache = {}
+    return d.get(term, None)
 
 
 def _get_option_by_storage_form(directory, term, config, cache):
-    if directory not in cache:
+    d = cache.get(directory)
+    if d is None:
         d = {}
         for n in config:
             t = n.storage_form()
@@ -1101,27 +1191,21 @@ def _get_option_by_storage_form(directory, term, config, cache):
 
         cache[directory] = d
 
-    return cache[directory].get(term, None)
+    return d.get(term, None)
 
 
 def get_option_config_by_storage_form(directory, term):
-    cache = get_option_config_by_storage_form.__cache
+    cache = config_cache.table('get_option_config_by_storage_form')
     config = get_option_config(directory)
     return _get_option_by_storage_form(directory, term, config, cache)
 
 
-get_option_config_by_storage_form.__cache = {}
-
-
 def get_visual_option_config_by_storage_form(directory, term):
-    cache = get_visual_option_config_by_storage_form.__cache
+    cache = config_cache.table('get_visual_option_config_by_storage_form')
     config = get_visual_option_config(directory)
     return _get_option_by_storage_form(directory, term, config, cache)
 
 
-get_visual_option_config_by_storage_form.__cache = {}
-
-
 # access for settings for specific options in tools.conf
 # TODO: avoid fixed string values here, define vars earlier
 
@@ -1160,8 +1244,9 @@ def visual_options_get_text_direction(directory):
 
 
 def get_drawing_config_by_storage_form(directory, term):
-    cache = get_drawing_config_by_storage_form.__cache
-    if directory not in cache:
+    cache = config_cache.table('get_drawing_config_by_storage_form')
+    d = cache.get(directory)
+    if d is None:
         d = {}
         for n in get_drawing_config(directory):
             t = n.storage_form()
@@ -1221,10 +1306,7 @@ def get_drawing_config_by_storage_form(directory, term):
 
         cache[directory] = d
 
-    return cache[directory].get(term, None)
-
-
-get_drawing_config_by_storage_form.__cache = {}
+    return d.get(term, None)
 
 
 def __directory_relations_by_arg_num(
@@ -1270,62 +1352,62 @@ def __directory_relations_by_arg_num(
 
 
 def get_relations_by_arg1(directory, atype, include_special=False):
-    cache = get_relations_by_arg1.__cache
-    cache[directory] = cache.get(directory, {})
-    if (atype, include_special) not in cache[directory]:
-        cache[directory][(atype, include_special)] = __directory_relations_by_arg_num(
+    cache = config_cache.table('get_relations_by_arg1')
+    d = cache.get(directory)
+    if d is None:
+        d = cache[directory] = {}
+    relations = d.get((atype, include_special))
+    if relations is None:
+        relations = d[(atype, include_special)] = __directory_relations_by_arg_num(
             directory, 0, atype, include_special)
-    return cache[directory][(atype, include_special)]
-
-
-get_relations_by_arg1.__cache = {}
+    return relations
 
 
 def get_relations_by_arg2(directory, atype, include_special=False):
-    cache = get_relations_by_arg2.__cache
-    cache[directory] = cache.get(directory, {})
-    if (atype, include_special) not in cache[directory]:
-        cache[directory][(atype, include_special)] = __directory_relations_by_arg_num(
+    cache = config_cache.table('get_relations_by_arg2')
+    d = cache.get(directory)
+    if d is None:
+        d = cache[directory] = {}
+    relations = d.get((atype, include_special))
+    if relations is None:
+        relations = d[(atype, include_special)] = __directory_relations_by_arg_num(
             directory, 1, atype, include_special)
-    return cache[directory][(atype, include_special)]
-
-
-get_relations_by_arg2.__cache = {}
+    return relations
 
 
 def get_relations_by_storage_form(directory, rtype, include_special=False):
-    cache = get_relations_by_storage_form.__cache
-    cache[directory] = cache.get(directory, {})
-    if include_special not in cache[directory]:
-        cache[directory][include_special] = {}
+    cache = config_cache.table('get_relations_by_storage_form')
+    d = cache.get(directory)
+    if d is None:
+        d = cache[directory] = {}
+    relations = d.get(include_special)
+    if relations is None:
+        relations = d[include_special] = {}
         for r in get_relation_type_list(directory):
             if (r.storage_form() in SPECIAL_RELATION_TYPES and
                     not include_special):
                 continue
             if r.unused:
                 continue
-            if r.storage_form() not in cache[directory][include_special]:
-                cache[directory][include_special][r.storage_form()] = []
-            cache[directory][include_special][r.storage_form()].append(r)
-    return cache[directory][include_special].get(rtype, [])
-
-
-get_relations_by_storage_form.__cache = {}
+            if r.storage_form() not in relations:
+                relations[r.storage_form()] = []
+            relations[r.storage_form()].append(r)
+    return relations.get(rtype, [])
 
 
 def get_labels_by_storage_form(directory, term):
-    cache = get_labels_by_storage_form.__cache
-    if directory not in cache:
-        cache[directory] = {}
+    cache = config_cache.table('get_labels_by_storage_form')
+    d = cache.get(directory)
+    if d is None:
+        d = {}
         for l, labels in list(get_labels(directory).items()):
             # recognize <EMPTY> as specifying that a label should
             # be the empty string
             labels = [lab if lab != '<EMPTY>' else ' ' for lab in labels]
-            cache[directory][l] = labels
-    return cache[directory].get(term, None)
-
+            d[l] = labels
+        cache[directory] = d
+    return d.get(term, None)
 
-get_labels_by_storage_form.__cache = {}
 
 # fallback for missing or partial config: these are highly likely to
 # be entity (as opposed to an event or relation) types.
@@ -31,6 +31,17 @@ def remove_control_chars(s):
 
 class Messager:
     __pending_messages = []
+    # if set, messages are passed to sink(msg, type, duration) instead of
+    # being kept for output (e.g. to keep memory bounded in library use)
+    __sink = None
+
+    def set_sink(sink):
+        """Routes all further messages to given callable (None restores
+        pending messages). Returns the previous sink."""
+        previous = Messager.__sink
+        Messager.__sink = sink
+        return previous
+    set_sink = staticmethod(set_sink)
 
     def info(msg, duration=3, escaped=False):
         Messager.__message(msg, 'comment', duration, escaped)
@@ -120,6 +131,9 @@ class Messager:
     def __message(msg, type, duration, escaped):
         if not isinstance(msg, str) and not isinstance(msg, str):
             msg = str(msg)
+        if Messager.__sink is not None:
+            Messager.__sink(msg, type, duration)
+            return
         if not escaped:
             msg = Messager.__escape(msg)
         Messager.__pending_messages.append((msg, type, duration))
@@ -33,3 +33,6 @@ class SosMessager:
 
     def debug(msg, duration=3, escaped=False): pass
     debug = staticmethod(debug)
+
+    def set_sink(sink): pass
+    set_sink = staticmethod(set_sink)
@@ -14,6 +14,9 @@
         
         # instance-level (subword matching)
         python interanno.py        
+        
+        # all of the above in a single pass over the project
+        python interanno.py all
 '''
 
 import sys
@@ -35,7 +38,19 @@ def token_func(text):
     for match in re.finditer(token, text):
         yield match.start(), match.end()
 
-if agreement_type == 'polarity':
+if agreement_type == 'all':
+    f1_agreements = biaa.compute_f1_agreements(project, {
+        'relation': exact_match_instance_relation_evaluation,
+        'polarity': exact_match_instance_polarity_evaluation,
+        'instance': exact_match_instance_evaluation,
+        'token': (exact_match_token_evaluation, token_func),
+    })
+    for name, f1_agreement in f1_agreements.items():
+        biaa.iaa_report(f1_agreement)
+        print(name, "total mean =", f1_agreement.mean_sd_total()[0])
+        print("************************************************************")
+    sys.exit()
+elif agreement_type == 'polarity':
     f1_agreement = biaa.compute_f1_agreement(project, eval_func=exact_match_instance_polarity_evaluation)
 elif agreement_type == 'relation':
     f1_agreement = biaa.compute_f1_agreement(project, eval_func=exact_match_instance_relation_evaluation)     
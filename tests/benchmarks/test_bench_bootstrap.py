@@ -0,0 +1,17 @@
+import numpy as np
+
+from benchmarks.bench_bootstrap import MAX_BOOTSTRAP_SECONDS, bootstrap_seconds, random_agreement
+
+
+def test_random_agreement():
+    f1_agreement = random_agreement(5, annotators=4, labels=2)
+    assert f1_agreement._pdcl.shape == (6, 5, 2, 2)
+    avg, _ = f1_agreement.mean_sd_total()
+    assert 0.5 < avg < 1
+    assert np.all(f1_agreement.bootstrap_ci(50, seed=0).per_pair.low <= 1)
+
+
+def test_bootstrap_scale():
+    # a tenth of the resamples bench_bootstrap checks by default, with some slack for slower machines
+    f1_agreement = random_agreement(100000)
+    assert bootstrap_seconds(f1_agreement, 1000) < 2 * MAX_BOOTSTRAP_SECONDS / 10
@@ -0,0 +1,37 @@
+import numpy as np
+
+from bratiaa.agree import compute_f1_agreement
+from bratiaa.parser import parse_ann_file
+from benchmarks.suite import run_benchmark
+from benchmarks.synthetic import DEFAULT_SPEC, generate_project, write_ann_file
+
+
+def test_generated_project(tmp_path):
+    spec = DEFAULT_SPEC._replace(annotators=3, documents=4, tokens=50, seed=1)
+    annotators = generate_project(tmp_path, spec)
+    f1_agreement = compute_f1_agreement(tmp_path.as_posix())
+    assert f1_agreement.annotators == annotators
+    assert len(f1_agreement.documents) == 4
+    avg, _ = f1_agreement.mean_sd_total()
+    assert 0 < avg < 1
+
+
+def test_perfect_agreement(tmp_path):
+    generate_project(tmp_path, DEFAULT_SPEC._replace(documents=2, tokens=50, agreement=1.0))
+    avg, stddev = compute_f1_agreement(tmp_path.as_posix()).mean_sd_total()
+    assert np.isclose(avg, 1) and np.isclose(stddev, 0)
+
+
+def test_run_benchmark(tmp_path):
+    generate_project(tmp_path, DEFAULT_SPEC._replace(documents=2, tokens=50))
+    result = run_benchmark('exact_match_instance_evaluation', tmp_path.as_posix(), repeat=1)
+    assert result['name'] == 'exact_match_instance_evaluation'
+    assert result['seconds'] >= 0
+
+
+def test_write_ann_file(tmp_path):
+    path = tmp_path / 'large.ann'
+    lines = write_ann_file(path, 100, DEFAULT_SPEC._replace(attributes=1.0, relations=1.0))
+    parsed = parse_ann_file(path)
+    assert (len(parsed.textbounds), len(parsed.attributes), len(parsed.relations)) == (100, 100, 99)
+    assert lines == 299
@@ -59,3 +59,69 @@ def test_token_per_document(token_f1):
                                   [0.971772, 0.945131, 0.927706, 0.942524, 0.973579, 0.976562, 0.951711])
     npt.assert_array_almost_equal(sd,
                                   [0.008875, 0.033929, 0.046871, 0.035116, 0.01296, 0.009569, 0.019581])
+
+
+def test_path_based_eval_func(instance_f1):
+    def eval_func(ann_path_1, ann_path_2, tokens=None):
+        return exact_match_instance_evaluation(ann_path_1, ann_path_2, tokens=tokens)
+
+    f1 = F1Agreement(partial(input_generator, EXAMPLE_PROJECT), instance_f1.labels, eval_func=eval_func)
+    assert f1.mean_sd_total() == instance_f1.mean_sd_total()
+
+
+def test_project_index():
+    index = ProjectIndex(EXAMPLE_PROJECT)
+    assert index.annotators == ['Lisa', 'Maria', 'Max', 'Peter']
+    assert len(index.documents) == 7
+    assert index.stats[('Lisa', 'esp.train-doc-100.ann')].size > 0
+    assert [d.doc_id for d in index()] == index.documents
+
+
+def test_shared_project_index(instance_f1, token_f1):
+    index = ProjectIndex(EXAMPLE_PROJECT)
+    instance = compute_f1_agreement(EXAMPLE_PROJECT, index=index)
+    token = compute_f1_agreement(EXAMPLE_PROJECT, token_func=tokenize, index=index)
+    assert instance.mean_sd_total() == instance_f1.mean_sd_total()
+    assert token.mean_sd_total() == token_f1.mean_sd_total()
+
+
+def test_parallel_instance(instance_f1):
+    f1 = compute_f1_agreement(EXAMPLE_PROJECT, workers=2)
+    npt.assert_array_equal(f1._pdcl.toarray(), instance_f1._pdcl.toarray())
+
+
+def test_parallel_unpicklable_token_func(token_f1):
+    f1 = compute_f1_agreement(EXAMPLE_PROJECT, token_func=lambda text: tokenize(text), workers=2)
+    npt.assert_array_equal(f1._pdcl.toarray(), token_f1._pdcl.toarray())
+
+
+def test_sparse_backend(token_f1):
+    f1 = F1Agreement(partial(input_generator, EXAMPLE_PROJECT), token_f1.labels, eval_func=exact_match_token_evaluation,
+                     token_func=tokenize, backend='sparse')
+    npt.assert_array_equal(f1._pdcl.toarray(), token_f1._pdcl.toarray())
+    for stats in ['mean_sd_total', 'mean_sd_per_label', 'mean_sd_per_document']:
+        npt.assert_array_equal(getattr(f1, stats)(), getattr(token_f1, stats)())
+    npt.assert_array_equal(f1.compute_total_f1_matrix(), token_f1.compute_total_f1_matrix())
+
+
+def test_unknown_label(caplog):
+    with pytest.raises(KeyError, match='MISC'):
+        F1Agreement(partial(input_generator, EXAMPLE_PROJECT), ['LOC', 'ORG', 'PER'])
+    assert 'Encountered unknown label "MISC"' in caplog.text
+
+
+def test_path_based_token_eval_func(token_f1):
+    def eval_func(ann_path_1, ann_path_2, tokens=None):
+        return exact_match_token_evaluation(ann_path_1, ann_path_2, tokens=tokens)
+
+    f1 = F1Agreement(partial(input_generator, EXAMPLE_PROJECT), token_f1.labels, eval_func=eval_func,
+                     token_func=tokenize)
+    npt.assert_array_equal(f1._pdcl.toarray(), token_f1._pdcl.toarray())
+
+
+def test_multiple_metrics(instance_f1, token_f1):
+    agreements = compute_f1_agreements(EXAMPLE_PROJECT, {'instance': exact_match_instance_evaluation,
+                                                         'token': (exact_match_token_evaluation, tokenize)})
+    npt.assert_array_equal(agreements['instance']._pdcl.toarray(), instance_f1._pdcl.toarray())
+    npt.assert_array_equal(agreements['token']._pdcl.toarray(), token_f1._pdcl.toarray())
+    assert agreements['instance']._token_func is None
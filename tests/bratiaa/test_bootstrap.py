@@ -0,0 +1,59 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+from scipy.stats import binom
+
+from bratiaa.agree import compute_f1_agreement, compute_f1, _poisson_cdf, _poisson_counts, _resample_weights
+
+
+@pytest.mark.parametrize('num_documents', [1, 2, 7, 100])
+def test_resample_weights(num_documents):
+    weights = _resample_weights(np.random.RandomState(0), 20000, num_documents)
+    assert weights.shape == (20000, num_documents)
+    npt.assert_array_equal(weights.sum(axis=1), num_documents)
+    # how often a document is drawn is binomially distributed
+    frequencies = np.bincount(weights.ravel(), minlength=num_documents + 1) / weights.size
+    npt.assert_allclose(frequencies, binom.pmf(np.arange(num_documents + 1), num_documents, 1 / num_documents),
+                        atol=0.01)
+
+
+def test_poisson_counts():
+    cdf = _poisson_cdf(1)
+    counts = _poisson_counts(np.random.RandomState(0), cdf, 10 ** 6, np.int64)
+    npt.assert_allclose(np.bincount(counts, minlength=len(cdf)) / len(counts), np.diff(cdf, prepend=0), atol=0.002)
+
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse'])
+def test_matches_naive_bootstrap(synthetic_project, backend):
+    f1_agreement = compute_f1_agreement(synthetic_project, backend=backend)
+    ci = f1_agreement.bootstrap_ci(200, level=0.9, seed=1)
+    # same resamples, one at a time
+    pdcl = f1_agreement._pdcl.toarray()
+    weights = _resample_weights(np.random.RandomState(1), 200, len(f1_agreement.documents))
+    totals = []
+    for w in weights:
+        pc = np.einsum('d,pdcl->pc', w, pdcl)
+        totals.append(np.mean(compute_f1(pc[:, 0], pc[:, 1])))
+    npt.assert_allclose([ci.total.low, ci.total.high], np.percentile(totals, [5, 95]))
+
+
+def test_intervals(synthetic_project):
+    f1_agreement = compute_f1_agreement(synthetic_project)
+    ci = f1_agreement.bootstrap_ci(300, seed=0)
+    avg, _ = f1_agreement.mean_sd_total()
+    assert ci.total.low <= avg <= ci.total.high
+    assert ci.per_label.low.shape == (len(f1_agreement.labels),)
+    assert ci.per_pair.low.shape == (len(f1_agreement.pairs),) == (3,)
+    assert np.all(ci.per_pair.low <= ci.per_pair.high)
+    narrow = f1_agreement.bootstrap_ci(300, level=0.5, seed=0)
+    assert ci.total.low <= narrow.total.low <= narrow.total.high <= ci.total.high
+    again = f1_agreement.bootstrap_ci(300, seed=0)
+    npt.assert_array_equal(again.per_label.high, ci.per_label.high)
+
+
+def test_resampling_unit(synthetic_project):
+    f1_agreement = compute_f1_agreement(synthetic_project)
+    with pytest.raises(ValueError):
+        f1_agreement.bootstrap_ci(10, by='pair')
+    with pytest.raises(ValueError):
+        compute_f1_agreement(synthetic_project, backend='aggregate').bootstrap_ci(10)
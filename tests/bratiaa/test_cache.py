@@ -0,0 +1,97 @@
+import numpy.testing as npt
+
+from bratiaa.agree import compute_f1_agreement, F1Agreement, ProjectIndex
+from bratiaa.cache import ParseCache, _tokenizer_key
+from bratiaa.evaluation import exact_match_token_evaluation
+from bratiaa.messages import Message
+from bratiaa.parser import parse_ann_file
+from bratiaa.utils import tokenize
+
+
+def test_cached_agreement(project, tmp_path):
+    uncached = compute_f1_agreement(str(project), token_func=tokenize)
+    cache = ParseCache(tmp_path / 'cache', project)
+    first = compute_f1_agreement(str(project), token_func=tokenize, cache=cache)
+    assert cache.hits == 0
+    second = compute_f1_agreement(str(project), token_func=tokenize, cache=cache)
+    assert cache.hits == cache.misses  # 7 texts, 28 ANN files
+    npt.assert_array_equal(first._pdcl.toarray(), uncached._pdcl.toarray())
+    npt.assert_array_equal(second._pdcl.toarray(), uncached._pdcl.toarray())
+
+
+def test_changed_file_is_parsed_again(project, tmp_path):
+    cache = ParseCache(tmp_path / 'cache', project)
+    ann_path = project / 'Lisa' / 'esp.train-doc-29.ann'
+    cache.parse_ann_file(ann_path)
+    with open(ann_path, 'a', encoding='utf-8') as fout:
+        fout.write('T99\tPER 0 4\tJust\n')
+    assert cache.parse_ann_file(ann_path) == parse_ann_file(ann_path)
+    assert cache.misses == 2
+
+
+def test_config_change_invalidates(project, tmp_path):
+    ann_path = project / 'Lisa' / 'esp.train-doc-29.ann'
+    ParseCache(tmp_path / 'cache', project).parse_ann_file(ann_path)
+    with open(project / 'annotation.conf', 'a', encoding='utf-8') as fout:
+        fout.write('\n# changed\n')
+    cache = ParseCache(tmp_path / 'cache', project)
+    cache.parse_ann_file(ann_path)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_eviction(project, tmp_path):
+    cache = ParseCache(tmp_path / 'cache', project, max_bytes=4096)
+    for ann_path in sorted(project.glob('*/*.ann')):
+        cache.parse_ann_file(ann_path)
+        assert cache._size <= 4096
+    assert 0 < sum(1 for _ in cache._entries()) < 28
+
+
+def test_config_change_invalidates_long_lived_cache(project, tmp_path):
+    ann_path = project / 'Lisa' / 'esp.train-doc-29.ann'
+    cache = ParseCache(tmp_path / 'cache', project)
+    cache.parse_ann_file(ann_path)
+    with open(project / 'annotation.conf', 'a', encoding='utf-8') as fout:
+        fout.write('\n# changed\n')
+    cache.parse_ann_file(ann_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def whitespace_tokenizer(text):
+    return tokenize(text)
+
+
+def test_tokenizer_key_changes_with_code():
+    key = _tokenizer_key(whitespace_tokenizer)
+    assert key == _tokenizer_key(whitespace_tokenizer)
+    whitespace_tokenizer.cache_version = 2
+    assert _tokenizer_key(whitespace_tokenizer) != key
+    del whitespace_tokenizer.cache_version
+    original = whitespace_tokenizer.__code__
+    whitespace_tokenizer.__code__ = (lambda text: list(tokenize(text))).__code__
+    try:
+        assert _tokenizer_key(whitespace_tokenizer) != key
+    finally:
+        whitespace_tokenizer.__code__ = original
+    assert _tokenizer_key(lambda text: text) is None
+
+
+def test_project_without_config(project, tmp_path):
+    expected = compute_f1_agreement(str(project), token_func=tokenize)
+    (project / 'annotation.conf').unlink()
+    cache = ParseCache(tmp_path / 'cache', project)
+    f1 = F1Agreement(ProjectIndex(project), expected.labels, eval_func=exact_match_token_evaluation, token_func=tokenize,
+                     cache=cache)
+    assert cache.config_digest == ''
+    npt.assert_array_equal(f1._pdcl.toarray(), expected._pdcl.toarray())
+
+
+def test_messages_of_cached_files(project, tmp_path):
+    with open(project / 'Lisa' / 'esp.train-doc-100.ann', 'a', encoding='utf-8') as fout:
+        fout.write('R99\tTarget Arg1:T1\t\n')
+    cache = ParseCache(tmp_path / 'cache', project)
+    cold = compute_f1_agreement(str(project), cache=cache)
+    warm = compute_f1_agreement(str(project), cache=cache)
+    assert cache.hits == cache.misses
+    assert warm.messages == cold.messages == {
+        'esp.train-doc-100.ann': [Message('error', 'Error parsing relation: must have exactly two arguments')]}
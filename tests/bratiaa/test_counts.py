@@ -0,0 +1,58 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from bratiaa.counts import create_counts, DenseCounts, SparseCounts
+
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse'])
+def test_add_and_reduce(backend):
+    counts = create_counts(3, 4, 5, backend=backend)
+    block = np.arange(30).reshape(3, 2, 5)
+    counts.add(1, block)
+    counts.add(1, block)
+    counts.add(3, block)
+    npt.assert_array_equal(counts.document(1), 2 * block)
+    npt.assert_array_equal(counts.document(0), np.zeros_like(block))
+    npt.assert_array_equal(counts.sum_documents(), 3 * block)
+    npt.assert_array_equal(counts.sum_labels(1, 4), counts.toarray()[:, 1:4].sum(axis=3))
+
+
+def test_dense_dtype_grows_with_counts():
+    counts = DenseCounts((1, 1, 2, 1))
+    assert counts.toarray().dtype == np.int64
+    counts.add(0, np.full((1, 2, 1), 200))
+    counts.add(0, np.full((1, 2, 1), 200))
+    assert counts.document(0)[0, 0, 0] == 400
+    assert counts.nbytes == 2 * np.dtype(np.uint16).itemsize
+
+
+def test_automatic_backend(monkeypatch):
+    monkeypatch.setattr('bratiaa.counts.MAX_DENSE_BYTES', 100)
+    # budget is for 4 bytes per cell, the widest dense dtype
+    assert isinstance(create_counts(2, 3, 2), DenseCounts)
+    assert isinstance(create_counts(2, 4, 2), SparseCounts)
+
+
+def test_dense_dtype_is_bounded():
+    counts = DenseCounts((1, 1, 2, 1))
+    counts.add(0, np.full((1, 2, 1), 2 ** 31))
+    assert counts.nbytes == 2 * np.dtype(np.uint32).itemsize
+    with pytest.raises(OverflowError):
+        counts.add(0, np.full((1, 2, 1), 2 ** 31))
+
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse'])
+def test_cells(backend):
+    counts = create_counts(3, 4, 5, backend=backend)
+    block = np.arange(30).reshape(3, 2, 5)
+    counts.add(2, block)
+    loaded = create_counts(3, 4, 5, backend=backend)
+    loaded.add(2, block)
+    p, d, c, l, values = counts.cells()
+    assert np.all(d == 2) and len(values) == 29
+    loaded.add_cells(p, d, c, l, values)
+    loaded.add_cells([0, 0], [1, 1], [1, 1], [4, 4], [3, 4])  # repeated cells are summed
+    npt.assert_array_equal(loaded.document(2), 2 * block)
+    assert loaded.document(1)[0, 1, 4] == 7
+    npt.assert_array_equal(loaded.sum_documents(), loaded.toarray().sum(axis=1))
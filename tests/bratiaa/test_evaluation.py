@@ -0,0 +1,68 @@
+import pickle
+from collections import Counter
+
+import pytest
+
+from bratiaa.evaluation import (_read_relations, _read_polarities, FinalAnnotation, FinalRelAnnotation,
+                                PolarityEvaluation, TargetNotFoundError)
+
+ANN = '\n'.join([
+    'T1\tGENERAL 0 4\tThis',
+    'T2\tPER 5 7\tis',
+    'T3\tVIOLENCE 8 9\ta',
+    'A1\tPolarity T1 0',
+    'A2\tPolarity T3 1',
+    'A3\tPolarity T2 1',
+    'A4\tUntargeted T2 YES',
+    'R1\tTarget Arg1:T1 Arg2:T2\t',
+    ''
+])
+
+
+def write(tmp_path, content):
+    path = tmp_path / 'doc.ann'
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+def test_read_relations(tmp_path):
+    assert _read_relations(write(tmp_path, ANN)) == Counter([
+        FinalRelAnnotation('R', 'targeted', 'GENERAL', 'PER'),
+        FinalRelAnnotation('R', 'untargeted', 'PER', 'NULL'),
+    ])
+
+
+def test_read_polarities(tmp_path):
+    assert _read_polarities(write(tmp_path, ANN)) == Counter([
+        FinalAnnotation('T', 'GENERAL', '0'),
+        FinalAnnotation('T', 'VIOLENCE', '1'),
+    ])
+
+
+def test_relation_with_missing_target(tmp_path):
+    path = write(tmp_path, ANN + 'R2\tTarget Arg1:T1 Arg2:T9\t\n')
+    with pytest.raises(TargetNotFoundError, match='T9 referenced by R2'):
+        _read_relations(path)
+
+
+def test_polarity_evaluation_parameters(tmp_path):
+    path = write(tmp_path, ANN)
+    evaluation = PolarityEvaluation(aspect_labels=None, values=['1'])
+    tp, exp, pred = evaluation(path, path)
+    assert Counter(tp) == Counter([FinalAnnotation('T', 'VIOLENCE', '1'), FinalAnnotation('T', 'PER', '1')])
+    assert pickle.loads(pickle.dumps(evaluation)).values == evaluation.values
+
+
+def test_missing_target_names_file(tmp_path):
+    from bratiaa.agree import compute_f1_agreement
+    from bratiaa.evaluation import exact_match_instance_relation_evaluation
+    (tmp_path / 'annotation.conf').write_text('[entities]\nGENERAL\nPER\nVIOLENCE\ntargeted\nuntargeted\n[relations]\n'
+                                              'Target Arg1:GENERAL, Arg2:PER\n[events]\n[attributes]\n',
+                                              encoding='utf-8')
+    for annotator in ('a', 'b'):
+        (tmp_path / annotator).mkdir()
+        (tmp_path / annotator / 'doc.txt').write_text('This is a test', encoding='utf-8')
+        write(tmp_path / annotator, ANN)
+    bad_path = write(tmp_path / 'b', ANN + 'R2\tTarget Arg1:T1 Arg2:T9\t\n')
+    with pytest.raises(TargetNotFoundError, match=f'T9 referenced by R2 in {bad_path}'):
+        compute_f1_agreement(str(tmp_path), eval_func=exact_match_instance_relation_evaluation)
@@ -0,0 +1,62 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+
+from bratiaa.agree import compute_f1_agreement, F1Agreement
+from bratiaa.export import export_counts, load_agreement
+
+
+@pytest.fixture(scope='module')
+def f1_agreement(synthetic_project):
+    return compute_f1_agreement(synthetic_project)
+
+
+def assert_same_agreement(actual, expected):
+    assert actual.annotators == expected.annotators
+    assert actual.documents == expected.documents
+    assert actual.labels == expected.labels
+    npt.assert_array_equal(actual._pdcl.toarray(), expected._pdcl.toarray())
+    npt.assert_allclose(actual.mean_sd_per_document(), expected.mean_sd_per_document())
+    npt.assert_allclose(actual.compute_total_f1_matrix(), expected.compute_total_f1_matrix())
+
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse'])
+def test_npz_round_trip(f1_agreement, tmp_path, backend):
+    export_counts(f1_agreement, tmp_path / 'counts.npz')
+    assert_same_agreement(load_agreement(tmp_path / 'counts.npz', backend=backend), f1_agreement)
+
+
+def test_npz_columns(f1_agreement, tmp_path):
+    export_counts(f1_agreement, tmp_path / 'counts.npz')
+    with np.load(tmp_path / 'counts.npz') as npz:
+        assert npz['annotators'].tolist() == f1_agreement.annotators
+        assert len(npz['pair_annotators']) == len(f1_agreement.pairs) == 3
+        assert np.all(npz['total'] > 0)
+        assert np.all(npz['tp'] <= npz['total'])
+        assert npz['tp'].sum() == f1_agreement._pdcl.sum_documents()[:, 0].sum()
+
+
+def test_parquet_round_trip(f1_agreement, tmp_path):
+    pytest.importorskip('pyarrow')
+    export_counts(f1_agreement, tmp_path / 'counts.parquet')
+    assert_same_agreement(load_agreement(tmp_path / 'counts.parquet'), f1_agreement)
+
+
+def test_unknown_format(f1_agreement, tmp_path):
+    with pytest.raises(ValueError):
+        export_counts(f1_agreement, tmp_path / 'counts.csv')
+
+
+def test_update_loaded_agreement(f1_agreement, tmp_path):
+    export_counts(f1_agreement, tmp_path / 'counts.npz')
+    loaded = load_agreement(tmp_path / 'counts.npz')
+    with pytest.raises(ValueError, match='no corpus'):
+        loaded.update(loaded.documents[:1])
+
+
+@pytest.mark.parametrize('documents', [[], ['a', 'b']])
+@pytest.mark.parametrize('backend', ['dense', 'sparse'])
+def test_empty_export(tmp_path, documents, backend):
+    empty = F1Agreement(None, ['PER'], annotators=['x', 'y'], documents=documents, count=False)
+    export_counts(empty, tmp_path / 'counts.npz')
+    assert_same_agreement(load_agreement(tmp_path / 'counts.npz', backend=backend), empty)
@@ -0,0 +1,97 @@
+import numpy.testing as npt
+import pytest
+
+from bratiaa.agree import compute_f1_agreement
+from bratiaa.evaluation import (exact_match_instance_evaluation, exact_match_instance_relation_evaluation,
+                                RelationEvaluation)
+from bratiaa.filters import AnnotationFilter
+from bratiaa.parser import parse_ann_file, Attribute, Relation
+from bratsubset.projectconfig import ProjectConfiguration
+
+EXAMPLE_PROJECT = 'example-files/example-project'
+
+ANN = '\n'.join([
+    'T1\tGENERAL 0 4\tThis',
+    'T2\tPER 5 7\tis',
+    'T3\tNUM 8 9\t1',
+    'A1\tPolarity T1 0',
+    'A2\tPolarity T2 1',
+    'A3\tUntargeted T3 YES',
+    'R1\tTarget Arg1:T1 Arg2:T2\t',
+    'R2\tOther Arg1:T1 Arg2:T2\t',
+    'R3\tTarget Arg1:T1 Arg2:T3\t',
+    ''
+])
+
+
+@pytest.fixture
+def ann_path(tmp_path):
+    path = tmp_path / 'doc.ann'
+    path.write_text(ANN, encoding='utf-8')
+    return path
+
+
+def test_exclude_label(ann_path):
+    parsed = parse_ann_file(ann_path, AnnotationFilter(exclude_labels=['NUM']).compile())
+    assert [t.id for t in parsed.textbounds] == ['T1', 'T2']
+    # annotations referencing T3 are dropped as well
+    assert [a.id for a in parsed.attributes] == ['A1', 'A2']
+    assert [r.id for r in parsed.relations] == ['R1', 'R2']
+
+
+def test_include_attribute_values_and_relations(ann_path):
+    parsed = parse_ann_file(ann_path, AnnotationFilter(attributes=[('Polarity', '1')], relations=['Target']).compile())
+    assert [t.id for t in parsed.textbounds] == ['T1', 'T2', 'T3']
+    assert parsed.attributes == [Attribute('A2', 'Polarity', 'T2', '1')]
+    assert parsed.relations == [Relation('R1', 'Target', 'T1', 'T2'), Relation('R3', 'Target', 'T1', 'T3')]
+
+
+def test_exclude_attribute_value(ann_path):
+    parsed = parse_ann_file(ann_path, AnnotationFilter(exclude_attributes=[('Polarity', '0'), 'Untargeted']).compile())
+    assert [a.id for a in parsed.attributes] == ['A2']
+
+
+def test_validation():
+    config = ProjectConfiguration(EXAMPLE_PROJECT)
+    AnnotationFilter(labels=['PER', 'LOC']).compile(config)
+    with pytest.raises(ValueError, match='NUM'):
+        AnnotationFilter(exclude_labels=['NUM']).compile(config)
+
+
+def test_compute_f1_agreement_with_filter():
+    unfiltered = compute_f1_agreement(EXAMPLE_PROJECT)
+    per = compute_f1_agreement(EXAMPLE_PROJECT, annotation_filter=AnnotationFilter(labels=['PER']))
+    per_idx = per.labels.index('PER')
+    pdcl = unfiltered._pdcl.toarray()
+    npt.assert_array_equal(per._pdcl.toarray()[..., per_idx], pdcl[..., per_idx])
+    assert per._pdcl.toarray().sum() == pdcl[..., per_idx].sum()
+
+
+def test_default_filter_keeps_relations_to_num(tmp_path):
+    # relation evaluation labels are part of the project's entity types
+    (tmp_path / 'annotation.conf').write_text('[entities]\nGENERAL\nPER\nNUM\ntargeted\nuntargeted\n[relations]\n'
+                                              '[events]\n[attributes]\n', encoding='utf-8')
+    for annotator in ('a', 'b'):
+        (tmp_path / annotator).mkdir()
+        (tmp_path / annotator / 'doc.txt').write_text('This is 1', encoding='utf-8')
+        (tmp_path / annotator / 'doc.ann').write_text(ANN.replace('Arg1:T1 Arg2:T3', 'Arg1:T2 Arg2:T3'),
+                                                      encoding='utf-8')
+    relations = compute_f1_agreement(str(tmp_path), eval_func=exact_match_instance_relation_evaluation)
+    assert relations.mean_sd_total()[0] == 1.0
+    # the PER -> NUM relation and the untargeted NUM aspect are evaluated
+    targeted, untargeted = relations.labels.index('targeted'), relations.labels.index('untargeted')
+    assert relations._pdcl.toarray()[0, 0, 0, [targeted, untargeted]].tolist() == [3, 1]
+    instances = compute_f1_agreement(str(tmp_path), eval_func=exact_match_instance_evaluation)
+    assert instances._pdcl.toarray()[0, 0, 0, instances.labels.index('NUM')] == 0
+    # a user filter is combined with leaving out NUM
+    filtered = compute_f1_agreement(str(tmp_path), eval_func=exact_match_instance_evaluation,
+                                    annotation_filter=AnnotationFilter(exclude_labels=['PER']))
+    counts = filtered._pdcl.toarray()[0, 0, 1]
+    assert counts[filtered.labels.index('NUM')] == counts[filtered.labels.index('PER')] == 0
+    assert counts[filtered.labels.index('GENERAL')] == 2
+
+
+def test_relation_evaluation_untargeted_values(ann_path):
+    assert not RelationEvaluation(untargeted_values=['NO']).read_relations(ann_path)['untargeted']
+    labels = [a.label for a in RelationEvaluation(untargeted_values=['NO', 'YES']).read_relations(ann_path)]
+    assert labels.count('untargeted') == 1
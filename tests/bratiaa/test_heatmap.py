@@ -0,0 +1,27 @@
+import numpy as np
+import numpy.testing as npt
+
+from bratiaa.heatmap import draw_heatmap, write_png, colorize
+
+
+def test_write_png(tmp_path):
+    import matplotlib.image
+    matrix = np.array([[1, 0.5, np.nan], [0.5, 1, 0], [np.nan, 0, 1]])
+    path = tmp_path / 'heatmap.png'
+    write_png(matrix, path, cell_size=2)
+    image = matplotlib.image.imread(path)
+    assert image.shape == (6, 6, 3)
+    npt.assert_array_equal(np.round(image[::2, ::2] * 255).astype(np.uint8), colorize(matrix))
+
+
+def test_colorize_bounds():
+    npt.assert_array_equal(colorize(np.array([0, 1])), [[68, 1, 84], [253, 231, 37]])
+
+
+def test_draw_heatmap_leaves_no_figures(tmp_path):
+    import matplotlib.pyplot as plt
+    size = 30  # too large for per-cell annotations
+    path = tmp_path / 'heatmap.png'
+    draw_heatmap(np.eye(size), [f'annotator {i}' for i in range(size)], path)
+    assert path.stat().st_size > 0
+    assert plt.get_fignums() == []
@@ -0,0 +1,9 @@
+from benchmarks.bench_import import loaded_heavy_modules
+
+
+def test_import_does_not_load_heavy_modules():
+    assert loaded_heavy_modules('bratiaa') == []
+
+
+def test_cli_import_does_not_load_heavy_modules():
+    assert loaded_heavy_modules('bratiaa.agree_cli') == []
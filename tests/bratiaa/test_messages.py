@@ -0,0 +1,55 @@
+import logging
+
+from bratiaa.agree import compute_f1_agreement
+from bratiaa.messages import collect_messages, set_message_sink, Message, RingBufferSink
+from bratsubset.message import Messager
+
+
+def test_ring_buffer_sink():
+    sink = set_message_sink(RingBufferSink(maxlen=2))
+    try:
+        for i in range(3):
+            Messager.error(f'error {i}')
+    finally:
+        set_message_sink(None)
+    assert sink.drain() == [Message('error', 'error 1'), Message('error', 'error 2')]
+    assert sink.drain() == []
+
+
+def test_logging_sink(caplog):
+    set_message_sink('logging')
+    try:
+        Messager.warning('<b>not escaped</b>')
+    finally:
+        set_message_sink(None)
+    assert caplog.record_tuples == [('bratsubset', logging.WARNING, '<b>not escaped</b>')]
+
+
+def test_collect_messages():
+    sink = set_message_sink(RingBufferSink())
+    try:
+        with collect_messages(maxlen=1) as messages:
+            Messager.error('first')
+            Messager.error('second')
+        Messager.info('outside')
+    finally:
+        set_message_sink(None)
+    assert messages == [Message('error', 'second')]
+    assert sink.drain() == [Message('comment', 'outside')]
+
+
+def test_messages_per_document(project):
+    with open(project / 'Lisa' / 'esp.train-doc-100.ann', 'a', encoding='utf-8') as fout:
+        fout.write('R99\tTarget Arg1:T1\t\n')
+    f1_agreement = compute_f1_agreement(project.as_posix())
+    assert f1_agreement.messages == {
+        'esp.train-doc-100.ann': [Message('error', 'Error parsing relation: must have exactly two arguments')]}
+
+
+def test_messages_without_document_counts(project, caplog):
+    with open(project / 'Lisa' / 'esp.train-doc-100.ann', 'a', encoding='utf-8') as fout:
+        fout.write('R99\tTarget Arg1:T1\t\n')
+    f1_agreement = compute_f1_agreement(project.as_posix(), backend='aggregate')
+    assert f1_agreement.messages == {}
+    assert ('root', logging.ERROR, 'esp.train-doc-100.ann: Error parsing relation: must have exactly two arguments') \
+        in caplog.record_tuples
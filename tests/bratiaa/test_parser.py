@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+import bratsubset.annotation as bs
+from bratiaa.parser import parse_ann_file, TextBound, Attribute, Relation
+
+ANN = '\n'.join([
+    'T1\tGENERAL 0 4\tThis',
+    'T2\tPER 5 7;8 9\tis a',
+    'T3\tPER 5 7 8\tbroken',
+    'A1\tPolarity T1 0',
+    'A2\tUntargeted T2',
+    'M3\tNegation T1',
+    'R1\tTarget Arg1:T1 Arg2:T2\t',
+    'R2\tTarget Arg1:T1\t',
+    'T1\tLOC 0 4\tduplicate',
+    'no tab here',
+    '#1\tAnnotatorNotes T1\tcomment',
+    ''
+])
+
+
+@pytest.fixture
+def ann_path(tmp_path):
+    path = tmp_path / 'doc.ann'
+    path.write_text(ANN, encoding='utf-8')
+    return path
+
+
+def test_parse_ann_file(ann_path):
+    parsed = parse_ann_file(ann_path)
+    assert parsed.textbounds == [TextBound('T1', 'GENERAL', ((0, 4),)), TextBound('T2', 'PER', ((5, 7), (8, 9)))]
+    assert parsed.attributes == [Attribute('A1', 'Polarity', 'T1', '0'), Attribute('A2', 'Untargeted', 'T2', True),
+                                 Attribute('M3', 'Negation', 'T1', True)]
+    assert parsed.relations == [Relation('R1', 'Target', 'T1', 'T2')]
+    assert parsed.failed_lines == [2, 7, 8, 9]
+
+
+def test_same_as_annotations(ann_path):
+    parsed = parse_ann_file(ann_path)
+    with bs.Annotations(ann_path.as_posix(), read_only=True) as annotations:
+        assert parsed.failed_lines == annotations.failed_lines
+        assert [(a.id, a.type, tuple(a.spans)) for a in annotations.get_textbounds()] == parsed.textbounds
+        assert [(a.id, a.type, a.target, a.value) for a in annotations.get_attributes()] == parsed.attributes
+        assert [(a.id, a.type, a.arg1, a.arg2) for a in annotations.get_relations()] == parsed.relations
+
+
+@pytest.mark.parametrize('ann_path', sorted(Path('example-files/example-project').glob('*/*.ann')), ids=str)
+def test_example_project(ann_path):
+    with bs.Annotations(ann_path.as_posix(), read_only=True) as annotations:
+        expected = [(a.id, a.type, tuple(a.spans)) for a in annotations.get_textbounds()]
+    assert parse_ann_file(ann_path).textbounds == expected
@@ -0,0 +1,62 @@
+import json
+
+from bratiaa.agree import compute_f1_agreement, compute_f1_agreements
+from bratiaa.evaluation import (exact_match_instance_evaluation, exact_match_instance_polarity_evaluation,
+                                exact_match_instance_relation_evaluation, exact_match_token_evaluation)
+from bratiaa.profiling import Profile, profiling, stage, STAGES
+from bratiaa.utils import tokenize
+
+
+def test_stage_without_profile():
+    with stage('parse'):
+        pass
+
+
+def test_profile_stages(synthetic_project):
+    with profiling(top=2) as profile:
+        compute_f1_agreement(synthetic_project, token_func=tokenize)
+    summary = json.loads(json.dumps(profile.summary()))
+    assert list(summary['stages']) == STAGES
+    assert summary['stages']['parse']['calls'] == 30
+    assert summary['counters']['ann_files'] == 30
+    assert summary['counters']['texts'] == 10
+    assert summary['documents'] == 10
+    assert len(summary['slowest_documents']) == 2
+    slowest = [d['seconds'] for d in summary['slowest_documents']]
+    assert slowest == sorted(profile.documents.values(), reverse=True)[:2]
+
+
+def test_profile_workers(synthetic_project):
+    with profiling() as serial:
+        expected = compute_f1_agreement(synthetic_project)
+    with profiling() as parallel:
+        actual = compute_f1_agreement(synthetic_project, workers=2)
+    assert actual.mean_sd_total() == expected.mean_sd_total()
+    assert parallel.counters == serial.counters
+    assert set(parallel.documents) == set(serial.documents)
+
+
+def test_multiple_metrics_parse_once(synthetic_project):
+    metrics = {'instance': exact_match_instance_evaluation, 'polarity': exact_match_instance_polarity_evaluation,
+               'relation': exact_match_instance_relation_evaluation, 'token': (exact_match_token_evaluation, tokenize)}
+    with profiling() as profile:
+        compute_f1_agreements(synthetic_project, metrics)
+    assert profile.counters['ann_files'] == 30
+    assert profile.counters['texts'] == 10
+
+
+def test_on_document(synthetic_project):
+    seen = []
+    with profiling(on_document=lambda doc_id, seconds: seen.append(doc_id)):
+        compute_f1_agreement(synthetic_project)
+    assert len(seen) == 10
+
+
+def test_merge():
+    profile, other = Profile(top=1), Profile()
+    profile.add_document('a', 1.0)
+    other.add_time('parse', 0.5, calls=2)
+    other.add_document('b', 2.0)
+    profile.merge(other)
+    assert profile.stages == {'parse': [0.5, 2]}
+    assert profile.slowest_documents() == [('b', 2.0)]
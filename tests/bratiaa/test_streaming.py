@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from bratiaa import agree, agree_cli
+from bratiaa.agree import compute_f1_agreement, iaa_report, ProjectIndex
+from bratiaa.streaming import CsvDocumentSink, JsonlDocumentSink, open_document_sink
+
+
+def test_csv_sink(synthetic_project, tmp_path):
+    expected = compute_f1_agreement(synthetic_project)
+    with CsvDocumentSink(tmp_path / 'docs.csv') as sink:
+        actual = compute_f1_agreement(synthetic_project, backend='aggregate', document_sink=sink)
+    with open(tmp_path / 'docs.csv', encoding='utf-8', newline='') as fin:
+        rows = list(csv.DictReader(fin))
+    assert [row['document'] for row in rows] == expected.documents
+    avg, stddev = expected.mean_sd_per_document()
+    assert np.allclose([float(row['mean_f1']) for row in rows], avg)
+    assert np.allclose([float(row['sd_f1']) for row in rows], stddev)
+    assert np.allclose(actual.mean_sd_per_label(), expected.mean_sd_per_label(), equal_nan=True)
+    assert actual.mean_sd_total() == expected.mean_sd_total()
+
+
+def test_jsonl_sink(synthetic_project):
+    out = io.StringIO()
+    compute_f1_agreement(synthetic_project, workers=2, document_sink=JsonlDocumentSink(out))
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(records) == 10
+    assert set(records[0]) == {'document', 'mean_f1', 'sd_f1'}
+
+
+def test_nan_as_null():
+    out = io.StringIO()
+    JsonlDocumentSink(out)('doc', float('nan'), float('nan'))
+    assert json.loads(out.getvalue()) == {'document': 'doc', 'mean_f1': None, 'sd_f1': None}
+
+
+def test_aggregate_backend(synthetic_project):
+    f1_agreement = compute_f1_agreement(synthetic_project, backend='aggregate')
+    assert not f1_agreement.has_document_counts
+    with pytest.raises(ValueError):
+        f1_agreement.mean_sd_per_document()
+    with pytest.raises(ValueError):
+        f1_agreement.update(f1_agreement.documents[:1])
+    iaa_report(f1_agreement)  # without per-document table
+    assert f1_agreement._doc2idx is None
+
+
+def test_documents_are_read_lazily(synthetic_project, monkeypatch):
+    monkeypatch.setattr(agree, 'WORKER_CHUNK_SIZE', 1)
+    f1_agreement = compute_f1_agreement(synthetic_project, workers=2)
+    read = []
+
+    def documents():
+        for document in ProjectIndex(synthetic_project)():
+            read.append(document.doc_id)
+            yield document
+
+    results = f1_agreement._count_documents(f1_agreement._document_counter(), documents())
+    assert next(results)[0] == read[0]
+    assert len(read) < len(f1_agreement.documents)
+    assert [doc_id for doc_id, _, _ in results] == read[1:] == f1_agreement.documents[1:]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_document_sink(tmp_path / 'docs.txt')
+
+
+def test_cli_closes_sink_on_error(synthetic_project, tmp_path, monkeypatch):
+    sinks = []
+
+    def open_sink(path):
+        sinks.append(open_document_sink(path))
+        return sinks[-1]
+
+    def fail_after_first_document(project_root, document_sink=None, **kwargs):
+        document_sink('doc-00.ann', 1.0, 0.0)
+        raise RuntimeError('counting failed')
+
+    monkeypatch.setattr(agree_cli, 'open_document_sink', open_sink)
+    monkeypatch.setattr(agree_cli, 'compute_f1_agreement', fail_after_first_document)
+    monkeypatch.setattr('sys.argv', ['brat-iaa', synthetic_project, '--per-document', str(tmp_path / 'docs.csv')])
+    with pytest.raises(RuntimeError):
+        agree_cli.main()
+    assert sinks[0]._file.closed
+    assert (tmp_path / 'docs.csv').read_text(encoding='utf-8').splitlines() == ['document,mean_f1,sd_f1',
+                                                                                 'doc-00.ann,1.0,0.0']
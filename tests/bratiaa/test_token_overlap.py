@@ -55,3 +55,32 @@ def test_spans_overlapping_tokens():
 
     assert to.overlapping_tokens(6, 11) == [(5, 7), (8, 9), (10, 18)]
     assert to.overlapping_tokens(5, 15) == [(5, 7), (8, 9), (10, 18)]
+
+
+def test_lookup_variants_agree(monkeypatch):
+    import re
+    import bratiaa.utils
+    text = '  Lorem ipsum dolor sit amet, consectetur adipiscing elit.  '
+    tokens = [m.span() for m in re.finditer(r'\S+', text)]
+
+    table = TokenOverlap(text, tokens)
+    monkeypatch.setattr(bratiaa.utils, 'MAX_CHAR_TABLE_LENGTH', 0)
+    search = TokenOverlap(text, tokens)
+
+    assert table.char2token is not None and search.char2token is None
+    for start in range(len(text) + 1):
+        for end in range(start, len(text) + 1):
+            assert table.overlapping_tokens(start, end) == search.overlapping_tokens(start, end)
+
+
+def test_expand_matches_overlapping_tokens():
+    text = '   This is a sentence.'
+    tokens = [(3, 7), (8, 10), (11, 12), (13, 21), (21, 22)]
+    spans = [(start, end, label) for label, (start, end) in
+             enumerate((s, e) for s in range(len(text) + 1) for e in range(len(text) + 1))]
+
+    to = TokenOverlap(text, tokens)
+    expanded = to.expand(spans).tolist()
+
+    expected = [[label, ts, te] for start, end, label in spans for ts, te in to.overlapping_tokens(start, end)]
+    assert expanded == expected
@@ -0,0 +1,32 @@
+import numpy.testing as npt
+import pytest
+
+from bratiaa.agree import compute_f1_agreement, ProjectIndex
+from bratiaa.utils import tokenize
+
+DOC = 'esp.train-doc-29.ann'
+
+
+def edit(project, annotator, doc):
+    ann_path = project / annotator / doc
+    lines = ann_path.read_text(encoding='utf-8').splitlines(keepends=True)
+    ann_path.write_text(''.join(lines[1:]) + 'T99\tPER 0 4\tJust\n', encoding='utf-8')
+
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse'])
+@pytest.mark.parametrize('annotators', [None, ['Lisa']])
+def test_update(project, backend, annotators):
+    f1 = compute_f1_agreement(str(project), token_func=tokenize, backend=backend)
+    edit(project, 'Lisa', DOC)
+    f1.update([DOC], annotators=annotators)
+    expected = compute_f1_agreement(str(project), token_func=tokenize)
+    npt.assert_array_equal(f1._pdcl.toarray(), expected._pdcl.toarray())
+    assert f1.mean_sd_total() == expected.mean_sd_total()
+    npt.assert_array_equal(f1.mean_sd_per_label(), expected.mean_sd_per_label())
+    npt.assert_array_equal(f1.compute_total_f1_matrix(), expected.compute_total_f1_matrix())
+
+
+def test_update_unknown_document(project):
+    f1 = compute_f1_agreement(str(project), index=ProjectIndex(project))
+    with pytest.raises(AssertionError, match='Unknown document'):
+        f1.update(['missing.ann'])
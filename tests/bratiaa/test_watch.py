@@ -0,0 +1,42 @@
+import shutil
+import threading
+import time
+
+from bratiaa.agree import ProjectIndex
+from bratiaa.watch import watch_project
+
+
+def append(path, text):
+    with open(path, 'a', encoding='utf-8') as fout:
+        fout.write(text)
+
+
+def test_changed_documents(project):
+    index = ProjectIndex(project)
+    append(project / 'Max' / 'esp.train-doc-29.ann', 'T99\tPER 0 4\tJust\n')
+    append(project / 'Lisa' / 'esp.train-doc-46.txt', ' ')
+    append(project / 'Peter' / 'esp.train-doc-46.txt', ' ')  # only the first annotator's text is used
+    append(project / 'Lisa' / 'esp.train-doc-919.ann', 'T99\tPER 0 4\tJust\n')  # not an agreement document
+    changes = index.changed_documents(ProjectIndex(project))
+    assert changes == {'esp.train-doc-29.ann': {'Max'}, 'esp.train-doc-46.ann': set(index.annotators)}
+
+
+def test_added_document(project):
+    index = ProjectIndex(project)
+    for annotator in ['Maria', 'Max', 'Peter']:
+        shutil.copy(project / 'Lisa' / 'esp.train-doc-919.ann', project / annotator)
+    assert index.changed_documents(ProjectIndex(project)) is None
+
+
+def test_watch_batches_bursts(project):
+    index = ProjectIndex(project)
+
+    def save_burst():
+        for annotator in ['Lisa', 'Maria', 'Max']:
+            time.sleep(0.05)
+            append(project / annotator / 'esp.train-doc-29.ann', 'T99\tPER 0 4\tJust\n')
+
+    threading.Thread(target=save_burst).start()
+    new_index, changes = next(watch_project(index, interval=0.02, debounce=0.3))
+    assert changes == {'esp.train-doc-29.ann': {'Lisa', 'Maria', 'Max'}}
+    assert new_index.changed_documents(ProjectIndex(project)) == {}
@@ -1,7 +1,44 @@
-from bratsubset.projectconfig import ProjectConfiguration
+import os
+
+from bratsubset import projectconfig
+from bratsubset.projectconfig import ProjectConfiguration, ConfigCache, config_cache
 
 
 def test_reading_entity_types():
     project_root = 'data/agreement/agree-2'
     config = ProjectConfiguration(project_root)
     assert config.get_entity_types() == ['ORG', 'PER', 'LOC', 'MISC']
+
+
+def test_config_cache_invalidation(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_cache, 'check_interval', 0)
+    conf = tmp_path / 'annotation.conf'
+    conf.write_text('[entities]\nPER\n[relations]\n[events]\n[attributes]\n', encoding='utf-8')
+    config = ProjectConfiguration(tmp_path.as_posix())
+    assert config.get_entity_types() == ['PER']
+
+    conf.write_text('[entities]\nPER\nLOC\n[relations]\n[events]\n[attributes]\n', encoding='utf-8')
+    os.utime(conf, ns=(conf.stat().st_atime_ns, conf.stat().st_mtime_ns + 10 ** 9))
+    assert config.get_entity_types() == ['PER', 'LOC']
+
+
+def test_config_cache_bounds():
+    cache = ConfigCache(max_directories=2)
+    for directory in ['/a', '/b', '/c']:
+        cache.table('test')[directory] = directory
+    assert len(cache) == 2
+    assert '/a' not in cache.table('test')
+    assert cache.table('test')['/c'] == '/c'
+    cache.evict('/c')
+    assert '/c' not in cache.table('test')
+
+
+def test_config_changing_between_lookups(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_cache, 'check_interval', 0)
+    conf = tmp_path / 'annotation.conf'
+    conf.write_text('[entities]\nPER\n[relations]\n[events]\n[attributes]\n', encoding='utf-8')
+    # every check finds the configuration changed, dropping all values cached so far
+    stamps = iter(range(10 ** 6))
+    monkeypatch.setattr(projectconfig, '_config_stamps', lambda directory: next(stamps))
+    config = ProjectConfiguration(tmp_path.as_posix())
+    assert config.get_entity_types() == ['PER']
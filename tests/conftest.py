@@ -0,0 +1,64 @@
+"""
+Fixtures shared by the tests of several modules.
+"""
+import random
+import shutil
+
+import pytest
+
+EXAMPLE_PROJECT = 'example-files/example-project'
+
+ANNOTATORS = ['ann-1', 'ann-2', 'ann-3']
+
+LABELS = ['LOC', 'MISC', 'ORG', 'PER']
+
+NUM_DOCUMENTS = 10
+
+ANNOTATION_CONF = '[entities]\n{}\n[relations]\n[events]\n[attributes]\n'
+
+
+def write_project(root, annotators=ANNOTATORS, num_documents=NUM_DOCUMENTS, seed=0):
+    """
+    Writes a project of random texts with one-token entities, each of which every annotator misses or labels
+    differently now and then.
+    """
+    rng = random.Random(seed)
+    (root / 'annotation.conf').write_text(ANNOTATION_CONF.format('\n'.join(LABELS)), encoding='utf-8')
+    for annotator in annotators:
+        (root / annotator).mkdir()
+    for doc in range(num_documents):
+        words = [''.join(rng.choice('abcdefgh') for _ in range(rng.randint(2, 8))) for _ in range(40)]
+        text = ' '.join(words)
+        starts = [sum(len(w) + 1 for w in words[:i]) for i in range(len(words))]
+        entities = [(starts[i], starts[i] + len(words[i]), rng.choice(LABELS))
+                    for i in sorted(rng.sample(range(len(words)), 8))]
+        for annotator in annotators:
+            lines = []
+            for start, end, label in entities:
+                disagreement = rng.random()
+                if disagreement < 0.15:
+                    continue
+                if disagreement < 0.3:
+                    label = rng.choice(LABELS)
+                lines.append(f'T{len(lines) + 1}\t{label} {start} {end}\t{text[start:end]}\n')
+            (root / annotator / f'doc-{doc:02d}.txt').write_text(text, encoding='utf-8')
+            (root / annotator / f'doc-{doc:02d}.ann').write_text(''.join(lines), encoding='utf-8')
+    return root
+
+
+@pytest.fixture(scope='session')
+def synthetic_project(tmp_path_factory):
+    """
+    Path of a project written by write_project (shared by all tests, so don't modify it).
+    """
+    return write_project(tmp_path_factory.mktemp('synthetic-project')).as_posix()
+
+
+@pytest.fixture
+def project(tmp_path):
+    """
+    Path of a copy of the example project, which tests may modify.
+    """
+    root = tmp_path / 'project'
+    shutil.copytree(EXAMPLE_PROJECT, root)
+    return root